@@ -0,0 +1,67 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from app.commons.cache import TTLCache
+from app.commons.http_clients import Service
+from app.commons.http_clients import http_clients
+from app.config import ConfigClass
+
+_NOT_FOUND = object()
+
+user_cache = TTLCache(ConfigClass.AUTH_CACHE_SIZE, ConfigClass.AUTH_CACHE_TTL)
+project_admins_cache = TTLCache(ConfigClass.AUTH_CACHE_SIZE, ConfigClass.AUTH_CACHE_TTL)
+
+
+async def get_user(username: str) -> dict:
+    """Get user profile from auth service.
+
+    Profiles are cached for configured TTL. Unknown users are cached for shorter negative TTL, so repeated lookups of
+    the same missing user do not reach auth service either.
+    """
+
+    cached = user_cache.get(username)
+    if cached is _NOT_FOUND:
+        raise Exception(f'Error getting user {username} from auth service: user not found')
+    if cached is not None:
+        return cached
+
+    query = {
+        'username': username,
+        'exact': True,
+    }
+    client = http_clients.get(Service.AUTH)
+    response = await client.get(ConfigClass.AUTH_SERVICE + 'admin/user', params=query)
+    if response.status_code == 404:
+        user_cache.set(username, _NOT_FOUND, ConfigClass.AUTH_CACHE_NEGATIVE_TTL)
+    if response.status_code != 200:
+        raise Exception(f'Error getting user {username} from auth service: ' + str(response.json()))
+    user = response.json()['result']
+    user_cache.set(username, user, ConfigClass.AUTH_CACHE_TTL)
+    return user
+
+
+async def get_project_admins(project_code: str) -> list[dict]:
+    """Get active admins of the project from auth service.
+
+    Role membership is cached for configured TTL, projects without admins only for shorter negative TTL.
+    """
+
+    cached = project_admins_cache.get(project_code)
+    if cached is not None:
+        return cached
+
+    payload = {
+        'role_names': [f'{project_code}-admin'],
+        'status': 'active',
+    }
+    client = http_clients.get(Service.AUTH)
+    response = await client.post(ConfigClass.AUTH_SERVICE + 'admin/roles/users', json=payload)
+    if response.status_code != 200:
+        raise Exception(f'Error getting admins of project {project_code} from auth service: ' + str(response.json()))
+    project_admins = response.json()['result']
+    ttl = ConfigClass.AUTH_CACHE_TTL if project_admins else ConfigClass.AUTH_CACHE_NEGATIVE_TTL
+    project_admins_cache.set(project_code, project_admins, ttl)
+    return project_admins
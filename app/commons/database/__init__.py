@@ -0,0 +1,129 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import ConfigClass
+
+
+class PoolMetrics:
+    """Counters of connection checkouts from the pool since application start."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'checkout_wait_avg': self.wait_total / self.checkouts if self.checkouts else 0.0,
+            'checkout_wait_max': self.wait_max,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long callers wait for a connection and how often the wait times out."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+class Database:
+    """Keep one async engine with asyncpg driver for the application lifetime.
+
+    Engine is created on application startup and disposed on shutdown together with its pooled connections.
+    """
+
+    def __init__(self) -> None:
+        self._engine: AsyncEngine | None = None
+
+    def _create_engine(self) -> AsyncEngine:
+        url = make_url(ConfigClass.DB_URI).set(drivername='postgresql+asyncpg')
+        server_settings = {}
+        if ConfigClass.RDS_STATEMENT_TIMEOUT:
+            server_settings['statement_timeout'] = str(ConfigClass.RDS_STATEMENT_TIMEOUT)
+        return create_async_engine(
+            url,
+            poolclass=MeteredQueuePool,
+            pool_size=ConfigClass.RDS_POOL_SIZE,
+            max_overflow=ConfigClass.RDS_POOL_MAX_OVERFLOW,
+            pool_timeout=ConfigClass.RDS_POOL_TIMEOUT,
+            pool_recycle=ConfigClass.RDS_POOL_RECYCLE,
+            pool_pre_ping=ConfigClass.RDS_POOL_PRE_PING,
+            connect_args={'server_settings': server_settings},
+        )
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            raise RuntimeError('Database engine is not started')
+        return self._engine
+
+    def session(self) -> AsyncSession:
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    def pool_status(self) -> dict[str, Any]:
+        """Report pool occupancy and checkout metrics.
+
+        Saturation is the share of maximum number of connections, including overflow, currently checked out.
+        """
+
+        pool = self.engine.pool
+        max_connections = ConfigClass.RDS_POOL_SIZE + ConfigClass.RDS_POOL_MAX_OVERFLOW
+        return {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_connections': max_connections,
+            'saturation': pool.checkedout() / max_connections if max_connections else 0.0,
+            **pool_metrics.to_dict(),
+        }
+
+    async def startup(self) -> None:
+        self._engine = self._create_engine()
+
+    async def shutdown(self) -> None:
+        engine, self._engine = self._engine, None
+        if engine is not None:
+            await engine.dispose()
+
+
+database = Database()
+
+
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    """Provide session for a single request, it is closed once the response is sent."""
+
+    async with database.session() as session:
+        yield session
@@ -0,0 +1,60 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from enum import Enum
+
+import httpx
+
+from app.config import ConfigClass
+
+
+class Service(str, Enum):
+    """Downstream services called by approval service."""
+
+    AUTH = 'auth'
+    DATAOPS = 'dataops'
+    EMAIL = 'email'
+    METADATA = 'metadata'
+    NOTIFICATION = 'notification'
+
+
+class HTTPClientRegistry:
+    """Keep one pooled async http client per downstream service for the application lifetime.
+
+    Connections are kept alive and reused between calls. Clients are created on application startup and closed on
+    shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[Service, httpx.AsyncClient] = {}
+
+    def _create_client(self, service: Service) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=ConfigClass.HTTP_SERVICE_MAX_CONNECTIONS.get(
+                service.value, ConfigClass.HTTP_MAX_CONNECTIONS
+            ),
+            max_keepalive_connections=ConfigClass.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ConfigClass.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(ConfigClass.HTTP_TIMEOUT, connect=ConfigClass.HTTP_CONNECT_TIMEOUT)
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=ConfigClass.HTTP2_ENABLED)
+
+    def get(self, service: Service) -> httpx.AsyncClient:
+        try:
+            return self._clients[service]
+        except KeyError:
+            raise RuntimeError(f'HTTP client of {service.value} service is not started')
+
+    async def startup(self) -> None:
+        self._clients = {service: self._create_client(service) for service in Service}
+
+    async def shutdown(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HTTPClientRegistry()
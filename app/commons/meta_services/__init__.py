@@ -4,35 +4,76 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
-import httpx
+import asyncio
 
+from app.commons.http_clients import Service
+from app.commons.http_clients import http_clients
+from app.commons.meta_services.cache import node_cache
 from app.config import ConfigClass
 from app.models.base import EAPIResponseCode
 from app.resources.error_handler import APIException
 
 
-def get_node_by_id(entity_id: str) -> dict:
-    response = httpx.get(ConfigClass.META_SERVICE + f'item/{entity_id}/')
+async def get_node_by_id(entity_id: str, use_cache: bool = True) -> dict:
+    if use_cache:
+        cached = await node_cache.get_many([entity_id])
+        if entity_id in cached:
+            return cached[entity_id]
+
+    client = http_clients.get(Service.METADATA)
+    response = await client.get(ConfigClass.META_SERVICE + f'item/{entity_id}/')
     if response.status_code != 200:
         error_msg = f'Error calling Meta service get_node_by_id: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     if not response.json()['result']:
         error_msg = 'Folder not found'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.not_found.value)
-    return response.json()['result']
+    node = response.json()['result']
+    await node_cache.set_many([node])
+    return node
 
 
-async def bulk_get_by_ids(ids: list[str]) -> list[dict]:
+async def get_batch_by_ids(ids: list[str]) -> list[dict]:
     query_data = {'ids': ids}
-    async with httpx.AsyncClient() as client:
-        response = await client.get(ConfigClass.META_SERVICE + 'items/batch/', params=query_data)
+    client = http_clients.get(Service.METADATA)
+    url = ConfigClass.META_SERVICE + 'items/batch/'
+    if ConfigClass.METADATA_BATCH_TRANSPORT == 'body':
+        response = await client.post(url, json=query_data)
+    else:
+        response = await client.get(url, params=query_data)
     if response.status_code != 200:
         error_msg = f'Error calling Meta service bulk_get_by_ids: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     return response.json()['result']
 
 
-def get_files_recursive(entity: dict, headers: dict) -> list:
+async def bulk_get_by_ids(ids: list[str], use_cache: bool = True) -> list[dict]:
+    """Fetch metadata items in batches of configured size with limited number of batches in flight.
+
+    Cached items are served from node cache and only the rest is requested. Without cache all items are requested,
+    fetched items are still written into the cache.
+    """
+
+    cached = await node_cache.get_many(ids) if use_cache else {}
+    ids = [item_id for item_id in ids if item_id not in cached]
+    if not ids:
+        return list(cached.values())
+
+    batch_size = ConfigClass.METADATA_BATCH_SIZE
+    semaphore = asyncio.Semaphore(ConfigClass.METADATA_BATCH_CONCURRENCY)
+
+    async def fetch(batch: list[str]) -> list[dict]:
+        async with semaphore:
+            return await get_batch_by_ids(batch)
+
+    batches = [ids[start : start + batch_size] for start in range(0, len(ids), batch_size)]
+    results = await asyncio.gather(*[fetch(batch) for batch in batches])
+    fetched = [item for result in results for item in result]
+    await node_cache.set_many(fetched)
+    return list(cached.values()) + fetched
+
+
+async def get_files_recursive(entity: dict, headers: dict) -> list:
     parent_path = entity['parent_path']
     name = entity['name']
     query_data = {
@@ -41,8 +82,26 @@ def get_files_recursive(entity: dict, headers: dict) -> list:
         'recursive': True,
         'parent_path': f'{parent_path}/{name}',
     }
-    response = httpx.get(ConfigClass.META_SERVICE + 'items/search/', params=query_data, headers=headers)
+    client = http_clients.get(Service.METADATA)
+    response = await client.get(ConfigClass.META_SERVICE + 'items/search/', params=query_data, headers=headers)
     if response.status_code != 200:
         error_msg = f'Error calling Meta service get_files_recursive: {response.json()}'
         raise APIException(error_msg=error_msg, status_code=EAPIResponseCode.internal_error.value)
     return response.json()['result']
+
+
+async def get_folders_files_recursive(
+    folders: list[dict], headers: dict, concurrency: int | None = None
+) -> list[list[dict]]:
+    """Fetch files of multiple folders concurrently and return list of files per folder.
+
+    At most concurrency folders are fetched at the same time.
+    """
+
+    semaphore = asyncio.Semaphore(concurrency or ConfigClass.FOLDER_EXPANSION_CONCURRENCY)
+
+    async def fetch(folder: dict) -> list[dict]:
+        async with semaphore:
+            return await get_files_recursive(folder, headers)
+
+    return await asyncio.gather(*[fetch(folder) for folder in folders])
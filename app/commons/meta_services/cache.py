@@ -0,0 +1,92 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import json
+
+from aioredis import StrictRedis
+
+from app.commons.cache import TTLCache
+from app.config import ConfigClass
+from app.logger import logger
+
+
+class NodeCache:
+    """Cache of metadata nodes keyed by item id.
+
+    Nodes are kept in a size bounded in-process tier and optionally in redis, so entries are shared between workers.
+    Redis failures are logged and the cache falls back to the in-process tier only. Nodes are copied on the way in and
+    out, so callers are free to modify returned dictionaries.
+    """
+
+    key_prefix = 'approval:metadata:node:'
+
+    def __init__(self) -> None:
+        self.local = TTLCache(ConfigClass.METADATA_CACHE_SIZE, ConfigClass.METADATA_CACHE_TTL)
+        self._redis = None
+
+    @property
+    def enabled(self) -> bool:
+        return ConfigClass.METADATA_CACHE_TTL > 0
+
+    @property
+    def redis(self) -> StrictRedis | None:
+        if not ConfigClass.METADATA_CACHE_REDIS_ENABLED:
+            return None
+        if self._redis is None:
+            self._redis = StrictRedis.from_url(ConfigClass.REDIS_URI)
+        return self._redis
+
+    async def get_many(self, ids: list[str]) -> dict[str, dict]:
+        if not self.enabled:
+            return {}
+
+        nodes = {}
+        for item_id in ids:
+            node = self.local.get(item_id)
+            if node is not None:
+                nodes[item_id] = dict(node)
+
+        missing = [item_id for item_id in ids if item_id not in nodes]
+        if missing and self.redis:
+            try:
+                values = await self.redis.mget([self.key_prefix + item_id for item_id in missing])
+            except Exception as e:
+                logger.error(f'Unable to read metadata nodes from redis: {e}')
+                return nodes
+            for item_id, value in zip(missing, values):
+                if value is not None:
+                    node = json.loads(value)
+                    self.local.set(item_id, node, ConfigClass.METADATA_CACHE_TTL)
+                    nodes[item_id] = dict(node)
+        return nodes
+
+    async def set_many(self, nodes: list[dict]) -> None:
+        if not self.enabled:
+            return
+
+        for node in nodes:
+            self.local.set(node['id'], dict(node), ConfigClass.METADATA_CACHE_TTL)
+
+        if nodes and self.redis:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for node in nodes:
+                        pipe.set(self.key_prefix + node['id'], json.dumps(node), ex=ConfigClass.METADATA_CACHE_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                logger.error(f'Unable to write metadata nodes into redis: {e}')
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    async def close(self) -> None:
+        redis, self._redis = self._redis, None
+        if redis is not None:
+            await redis.close()
+            await redis.connection_pool.disconnect()
+
+
+node_cache = NodeCache()
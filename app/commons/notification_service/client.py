@@ -6,8 +6,8 @@
 
 from uuid import UUID
 
-import httpx
-
+from app.commons.http_clients import Service
+from app.commons.http_clients import http_clients
 from app.commons.meta_services import bulk_get_by_ids
 from app.commons.notification_service.models import CopyRequestAction
 from app.commons.notification_service.models import CopyRequestNotification
@@ -39,23 +39,29 @@ class Notification:
         self.action = action
         self.request_id = request_id
 
-    async def set_location(self, entity_id: str) -> Location:
-        result = await bulk_get_by_ids([entity_id])
-        node = Node(result[0])
+    def set_location(self, node: dict) -> Location:
+        node = Node(node)
         return Location(id=node.id, path=str(node.display_path), zone=node.zone)
 
-    async def set_targets(self) -> list[Target]:
-        result = await bulk_get_by_ids(self.include_ids)
-        nodes = {node['id']: Node(node) for node in result}
+    def set_targets(self, nodes: dict[str, dict]) -> list[Target]:
         targets = []
-        for _node, file_node in nodes.items():
+        for entity_id in dict.fromkeys(map(str, self.include_ids)):
+            if entity_id not in nodes:
+                continue
+            file_node = Node(nodes[entity_id])
             targets.append(Target(id=file_node.id, name=file_node.name, type=TargetType(file_node.entity_type)))
         return targets
 
     async def to_copy_request_notification(self):
-        source_folder = await self.set_location(self.source_id) if self.source_id else None
-        targets_entity = await self.set_targets() if self.include_ids else None
-        destination_folder = await self.set_location(self.destination_id) if self.destination_id else None
+        """Build notification with source, destination and target nodes fetched in a single batch lookup."""
+
+        ids = [str(entity_id) for entity_id in (self.source_id, self.destination_id) if entity_id]
+        ids = list(dict.fromkeys(ids + [str(entity_id) for entity_id in self.include_ids or []]))
+        nodes = {node['id']: node for node in await bulk_get_by_ids(ids)} if ids else {}
+
+        source_folder = self.set_location(nodes[str(self.source_id)]) if self.source_id else None
+        targets_entity = self.set_targets(nodes) if self.include_ids else None
+        destination_folder = self.set_location(nodes[str(self.destination_id)]) if self.destination_id else None
         notification = CopyRequestNotification(
             recipient_username=self.recipient_username,
             action=self.action,
@@ -78,8 +84,8 @@ class NotificationServiceClient:
     async def send_notification(self, notification: CopyRequestNotification) -> None:
         """Calling notification service API to create notification."""
         payload = notification.to_json()
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{self.endpoint}/all/notifications/', json=payload)
+        client = http_clients.get(Service.NOTIFICATION)
+        response = await client.post(f'{self.endpoint}/all/notifications/', json=payload)
         if response.status_code != 204:
             logger.error('Failed to create notification for copy request')
             raise Exception('Unable to create notifications for copy request')
@@ -4,8 +4,8 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
-import httpx
-
+from app.commons.http_clients import Service
+from app.commons.http_clients import http_clients
 from app.config import ConfigClass
 
 
@@ -17,7 +17,7 @@ class SrvEmail:
         payload = {
             'subject': subject,
             'sender': sender,
-            'receiver': [receiver],
+            'receiver': receiver if isinstance(receiver, list) else [receiver],
             'msg_type': msg_type,
         }
         if content:
@@ -25,6 +25,6 @@ class SrvEmail:
         if template:
             payload['template'] = template
             payload['template_kwargs'] = template_kwargs
-        async with httpx.AsyncClient() as client:
-            res = await client.post(url=url, json=payload)
+        client = http_clients.get(Service.EMAIL)
+        res = await client.post(url=url, json=payload)
         return res.json()
@@ -0,0 +1,191 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import asyncio
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.commons.database import database
+from app.config import ConfigClass
+from app.logger import logger
+from app.models.copy_request_sql import OutboxModel
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class OutboxDispatcher:
+    """Deliver outgoing notifications and emails persisted in outbox table from a background task.
+
+    Messages are enqueued in the same transaction as the change they announce, so nothing is sent for a rolled back
+    change and nothing is lost once it is committed. Failed deliveries are retried with exponential backoff until the
+    attempt limit is reached. Messages are claimed with FOR UPDATE SKIP LOCKED, so every worker can run a dispatcher.
+
+    Claimed messages are leased by moving their next attempt past the lease timeout in a short transaction, they are
+    delivered without holding any connection and results are recorded in another short transaction. Messages of a
+    worker that dies during delivery are picked up again once the lease expires. Sent messages are purged after the
+    retention period.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, Handler] = {}
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._purged_at: float | None = None
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        """Register coroutine function delivering messages of given kind."""
+
+        def decorator(func: Handler) -> Handler:
+            self._handlers[kind] = func
+            return func
+
+        return decorator
+
+    def enqueue(self, session: AsyncSession, kind: str, **payload: Any) -> OutboxModel:
+        """Add message into session, it is delivered once the session is committed."""
+
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown outbox message kind: {kind}')
+        message = OutboxModel(kind=kind, payload=jsonable_encoder(payload))
+        session.add(message)
+        return message
+
+    def wake(self) -> None:
+        """Let the background task pick up freshly committed messages without waiting for next poll."""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def backoff(attempts: int) -> timedelta:
+        delay = ConfigClass.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+        return timedelta(seconds=min(delay, ConfigClass.OUTBOX_RETRY_MAX_BACKOFF))
+
+    async def deliver(self, message: OutboxModel) -> str | None:
+        """Run handler of the message and return error of failed delivery."""
+
+        try:
+            await self._handlers[message.kind](**message.payload)
+        except Exception as e:
+            logger.error(f'Failed to deliver outbox message {message.id} of kind {message.kind}: {e}')
+            return str(e)
+        return None
+
+    def record(self, message: OutboxModel, error: str | None) -> None:
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            return
+        message.last_error = error
+        if message.attempts >= ConfigClass.OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+        else:
+            message.next_attempt_at = datetime.utcnow() + self.backoff(message.attempts)
+
+    async def claim(self) -> list[OutboxModel]:
+        """Lease one batch of due messages."""
+
+        now = datetime.utcnow()
+        query = (
+            select(OutboxModel)
+            .where(OutboxModel.status == 'pending', OutboxModel.next_attempt_at <= now)
+            .order_by(OutboxModel.next_attempt_at)
+            .limit(ConfigClass.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with database.session() as session:
+            messages = (await session.execute(query)).scalars().all()
+            for message in messages:
+                message.attempts += 1
+                message.next_attempt_at = now + timedelta(seconds=ConfigClass.OUTBOX_LEASE_TIMEOUT)
+            await session.commit()
+        return messages
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of due messages and return number of processed messages."""
+
+        messages = await self.claim()
+        if not messages:
+            return 0
+
+        errors = await asyncio.gather(*[self.deliver(message) for message in messages])
+        async with database.session() as session:
+            for message, error in zip(messages, errors):
+                self.record(await session.merge(message, load=False), error)
+            await session.commit()
+        return len(messages)
+
+    async def purge(self) -> int:
+        """Delete sent messages older than retention period and return number of deleted messages."""
+
+        sent_before = datetime.utcnow() - timedelta(seconds=ConfigClass.OUTBOX_RETENTION)
+        query = delete(OutboxModel).where(OutboxModel.status == 'sent', OutboxModel.sent_at < sent_before)
+        async with database.session() as session:
+            result = await session.execute(query)
+            await session.commit()
+        return result.rowcount
+
+    async def purge_periodically(self) -> None:
+        if self._purged_at is not None and time.monotonic() - self._purged_at < ConfigClass.OUTBOX_PURGE_INTERVAL:
+            return
+        self._purged_at = time.monotonic()
+        try:
+            await self.purge()
+        except Exception as e:
+            logger.error(f'Unable to purge sent outbox messages: {e}')
+
+    async def drain(self) -> None:
+        """Deliver messages until none of them is due."""
+
+        while await self.dispatch_once():
+            pass
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            await self.purge_periodically()
+            try:
+                processed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f'Unable to dispatch outbox messages: {e}')
+                processed = 0
+            if processed < ConfigClass.OUTBOX_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), ConfigClass.OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def startup(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stop background task and try to deliver remaining due messages within shutdown timeout."""
+
+        if self._task is None:
+            return
+        self._stopping = True
+        self.wake()
+        await self._task
+        self._task = None
+        try:
+            await asyncio.wait_for(self.drain(), ConfigClass.OUTBOX_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning('Outbox was not drained before shutdown, remaining messages are delivered on next start')
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -4,8 +4,8 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
-import httpx
-
+from app.commons.http_clients import Service
+from app.commons.http_clients import http_clients
 from app.config import ConfigClass
 from app.logger import logger
 from app.models.base import EAPIResponseCode
@@ -36,8 +36,8 @@ async def trigger_copy_pipeline(
         'project_code': project_code,
         'session_id': session_id,
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(ConfigClass.DATA_UTILITY_SERVICE + 'files/actions/', json=copy_data, headers=auth)
+    client = http_clients.get(Service.DATAOPS)
+    response = await client.post(ConfigClass.DATA_UTILITY_SERVICE + 'files/actions/', json=copy_data, headers=auth)
     if response.status_code >= 300:
         error_msg = f'Failed to start copy pipeline: {response.content}'
         logger.error(error_msg)
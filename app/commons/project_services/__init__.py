@@ -4,12 +4,37 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
+import aioredis
 from common.project.project_client import ProjectClient
 
+from app.commons.cache import TTLCache
 from app.config import ConfigClass
 
 
+class ManagedProjectClient(ProjectClient):
+    """Project client keeping one redis connection pool for the application lifetime."""
+
+    redis = None
+
+    async def connect_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(self.redis_url)
+
+    async def close(self) -> None:
+        redis, self.redis = self.redis, None
+        if redis is not None:
+            await redis.close()
+
+
+project_client = ManagedProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URI)
+project_cache = TTLCache(ConfigClass.PROJECT_CACHE_SIZE, ConfigClass.PROJECT_CACHE_TTL)
+
+
 async def query_project(project_code: str) -> dict:
-    project_client = ProjectClient(ConfigClass.PROJECT_SERVICE, ConfigClass.REDIS_URI)
-    project = await project_client.get(code=project_code)
+    """Get project by code, served from in-process cache in front of project client redis cache."""
+
+    project = project_cache.get(project_code)
+    if project is None:
+        project = await project_client.get(code=project_code)
+        project_cache.set(project_code, project, ConfigClass.PROJECT_CACHE_TTL)
     return project
@@ -4,108 +4,267 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
+import itertools
+from collections.abc import Iterable
+from collections.abc import Iterator
+from itertools import islice
 from uuid import UUID
 
-from fastapi_sqlalchemy import db
+from sqlalchemy import DateTime
+from sqlalchemy import String
+from sqlalchemy import and_
+from sqlalchemy import any_
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import literal
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
 
+from app.commons.cache import TTLCache
+from app.config import ConfigClass
 from app.models.copy_request_sql import EntityModel
 
+ENTITY_PATH_SEPARATOR = '/'
+REVIEW_STATUSES = ['pending', 'approved', 'denied']
+COPY_STATUSES = ['pending', 'copied']
 
-def get_sql_files_recursive(request_id: str, folder_id: str, file_ids: list[str] = None) -> list[EntityModel]:
-    if not file_ids:
-        file_ids = []
+# postgres protocol limits number of bind parameters of a single statement
+MAX_BIND_PARAMETERS = 32767
 
-    entities = db.session.query(EntityModel).filter_by(request_id=request_id, parent_id=folder_id)
-    for entity in entities:
-        if entity.entity_type == 'file':
-            if entity.review_status == 'pending':
-                file_ids.append(entity.entity_id)
-        else:
-            file_ids = get_sql_files_recursive(request_id, entity.entity_id, file_ids=file_ids)
-    return file_ids
+routing_cache = TTLCache(ConfigClass.ROUTING_CACHE_SIZE, ConfigClass.ROUTING_CACHE_TTL)
+routing_generations = TTLCache(ConfigClass.ROUTING_CACHE_SIZE, ConfigClass.ROUTING_CACHE_TTL)
+_routing_generation_counter = itertools.count()
 
 
-def get_all_sub_files(request_id: str, entity_ids: list[str]) -> list[str]:
-    entities = (
-        db.session.query(EntityModel).filter_by(request_id=request_id).filter(EntityModel.entity_id.in_(entity_ids))
+def build_entity_paths(entities: list[dict], known_paths: dict[str, str] | None = None) -> dict[str, str]:
+    """Compute materialized paths for entities of a single request.
+
+    Path of an entity is the list of its ancestor ids followed by its own id, joined by separator. Entities are
+    resolved against each other and against already known paths, which are extended in place. Entity whose parent is
+    not known is considered to be a top level one.
+    """
+
+    paths = {} if known_paths is None else known_paths
+    parents = {str(entity['id']): entity['parent'] and str(entity['parent']) for entity in entities}
+    for entity_id in parents:
+        chain = []
+        current = entity_id
+        while current not in paths and current in parents and current not in chain:
+            chain.append(current)
+            current = parents[current]
+        prefix = paths.get(current)
+        for item in reversed(chain):
+            prefix = f'{prefix}{ENTITY_PATH_SEPARATOR}{item}' if prefix else item
+            paths[item] = prefix
+    return paths
+
+
+def sub_file_ids_query(request_id: str, entity_ids: list[str], review_status: str) -> Select:
+    """Select ids of all files within given entities subtrees with specified review status.
+
+    Subtree of each entity is a range scan over the materialized path index.
+    """
+
+    root = aliased(EntityModel)
+    in_subtree = or_(
+        EntityModel.path == root.path,
+        and_(
+            EntityModel.path >= root.path + ENTITY_PATH_SEPARATOR,
+            EntityModel.path < root.path + chr(ord(ENTITY_PATH_SEPARATOR) + 1),
+        ),
     )
-    file_ids = []
-    for entity in entities:
-        if entity.entity_type == 'file' and entity.review_status == 'pending':
-            file_ids.append(entity.entity_id)
-        else:
-            file_ids = get_sql_files_recursive(request_id, entity.entity_id, file_ids=file_ids)
-    return file_ids
-
-
-def get_files_until_top_parent(request_id: UUID, file_ids: list[str]) -> set:
-    entity_ids = set()
-    entities = (
-        db.session.query(EntityModel).filter_by(request_id=request_id).filter(EntityModel.entity_id.in_(file_ids))
+    query = (
+        select(EntityModel.entity_id)
+        .distinct()
+        .join(root, and_(root.request_id == EntityModel.request_id, in_subtree))
+        .where(
+            root.request_id == request_id,
+            root.entity_id.in_(entity_ids),
+            EntityModel.entity_type == 'file',
+            EntityModel.review_status == review_status,
+        )
+    )
+    return query
+
+
+async def get_sub_file_ids(
+    session: AsyncSession, request_id: str, entity_ids: list[str], review_status: str
+) -> list[UUID]:
+    query = sub_file_ids_query(request_id, entity_ids, review_status)
+    return list((await session.execute(query)).scalars())
+
+
+async def get_all_sub_files(session: AsyncSession, request_id: str, entity_ids: list[str]) -> list[UUID]:
+    return await get_sub_file_ids(session, request_id, entity_ids, 'pending')
+
+
+async def get_files_until_top_parent(session: AsyncSession, request_id: UUID, file_ids: list[str]) -> set:
+    """Resolve ids of given files and all of their ancestors from materialized paths in a single query."""
+
+    query = select(EntityModel.path).where(EntityModel.request_id == request_id, EntityModel.entity_id.in_(file_ids))
+    paths = (await session.execute(query)).scalars()
+    return {entity_id for path in paths for entity_id in path.split(ENTITY_PATH_SEPARATOR)}
+
+
+async def get_all_sub_folder_nodes(
+    session: AsyncSession, request_id: str, entity_ids: list[str], review_status: str
+) -> list[UUID]:
+    return await get_sub_file_ids(session, request_id, entity_ids, review_status)
+
+
+async def get_routing(session: AsyncSession, request_id: UUID, entity_id: UUID) -> list[dict]:
+    """Resolve breadcrumb of the entity, the entity itself followed by its ancestors up to the top level one.
+
+    Whole chain is selected in a single query by ids listed in materialized path of the entity. Breadcrumbs are
+    cached per entity under the current generation of the request, which is renewed when entities of the request
+    change.
+    """
+
+    key = (str(request_id), _get_routing_generation(str(request_id)), str(entity_id))
+    routing = routing_cache.get(key)
+    if routing is not None:
+        return routing
+
+    node = aliased(EntityModel)
+    ancestor_ids = cast(func.string_to_array(node.path, ENTITY_PATH_SEPARATOR), ARRAY(PostgresUUID(as_uuid=True)))
+    query = (
+        select(EntityModel)
+        .join(node, and_(node.request_id == EntityModel.request_id, EntityModel.entity_id == any_(ancestor_ids)))
+        .where(node.request_id == request_id, node.entity_id == entity_id)
+        .order_by(EntityModel.path.desc())
     )
-    for entity in entities:
-        current = entity
-        while current is not None:
-            entity_ids.add(str(current.entity_id))
-            current = (
-                db.session.query(EntityModel).filter_by(request_id=request_id, entity_id=current.parent_id).first()
-            )
-    return entity_ids
-
-
-def get_sql_file_nodes_recursive(
-    request_id: str, folder_id: str, review_status: str, files: list = None
-) -> list[EntityModel]:
-    if not files:
-        files = []
-
-    entities = db.session.query(EntityModel).filter_by(request_id=request_id, parent_id=folder_id)
-    for entity in entities:
-        if entity.entity_type == 'file':
-            if entity.review_status == review_status:
-                files.append(entity.entity_id)
-        else:
-            files = get_sql_file_nodes_recursive(request_id, entity.entity_id, review_status, files=files)
-    return files
-
-
-def get_all_sub_folder_nodes(request_id: str, entity_ids: list[str], review_status: str) -> list[str]:
-    entities = (
-        db.session.query(EntityModel).filter_by(request_id=request_id).filter(EntityModel.entity_id.in_(entity_ids))
+    routing = [entity.to_dict() for entity in (await session.execute(query)).scalars()]
+    routing_cache.set(key, routing, ConfigClass.ROUTING_CACHE_TTL)
+    return routing
+
+
+def _get_routing_generation(request_id: str) -> int:
+    """Return generation of cached breadcrumbs of the request.
+
+    Generations are never reused, so breadcrumbs cached before invalidation or eviction of the generation are not
+    matched anymore and age out of the cache.
+    """
+
+    generation = routing_generations.get(request_id)
+    if generation is None:
+        generation = next(_routing_generation_counter)
+        routing_generations.set(request_id, generation, ConfigClass.ROUTING_CACHE_TTL)
+    return generation
+
+
+def invalidate_routing(request_id: UUID) -> None:
+    routing_generations.invalidate(str(request_id))
+
+
+async def update_files_sql(session: AsyncSession, request_id: UUID, updated_data: dict, file_ids: list[str]) -> int:
+    """Update given files of the request and commit the transaction.
+
+    Returns number of updated files.
+    """
+
+    query = (
+        update(EntityModel)
+        .where(EntityModel.request_id == request_id, EntityModel.entity_id.in_(file_ids))
+        .values(updated_data)
+        .execution_options(synchronize_session=False)
     )
-    files = []
-    for entity in entities:
-        if entity.entity_type == 'folder':
-            files = get_sql_file_nodes_recursive(request_id, entity.entity_id, review_status, files=files)
-        elif entity.review_status == review_status:
-            files.append(entity.entity_id)
-    return files
+    result = await session.execute(query)
+    await session.commit()
+    invalidate_routing(request_id)
+    return result.rowcount
 
 
-def update_files_sql(request_id: UUID, updated_data: dict, file_ids: list[str]):
-    files = db.session.query(EntityModel).filter_by(request_id=request_id).filter(EntityModel.entity_id.in_(file_ids))
-    files.update(updated_data)
-    db.session.commit()
-    return files
+async def get_request_summary(session: AsyncSession, request_id: UUID) -> dict:
+    """Count files of the request and their total size per review status and per copy status.
 
+    Both breakdowns are rolled up from a single GROUP BY over review and copy status pairs.
+    """
 
-def create_entity_from_node(request_id: str, entity: dict) -> EntityModel:
-    """Create entity in psql given meta."""
+    def totals(statuses: list[str]) -> dict[str, dict[str, int]]:
+        return {status: {'count': 0, 'size': 0} for status in statuses}
+
+    summary = {
+        'total': {'count': 0, 'size': 0},
+        'review_status': totals(REVIEW_STATUSES),
+        'copy_status': totals(COPY_STATUSES),
+    }
+    query = (
+        select(
+            EntityModel.review_status,
+            EntityModel.copy_status,
+            func.count(),
+            func.coalesce(func.sum(EntityModel.file_size), 0),
+        )
+        .where(EntityModel.request_id == request_id, EntityModel.entity_type == 'file')
+        .group_by(EntityModel.review_status, EntityModel.copy_status)
+    )
+    for review_status, copy_status, count, size in await session.execute(query):
+        groups = [
+            summary['total'],
+            summary['review_status'].setdefault(review_status, {'count': 0, 'size': 0}),
+            summary['copy_status'].setdefault(copy_status, {'count': 0, 'size': 0}),
+        ]
+        for group in groups:
+            group['count'] += count
+            group['size'] += int(size)
+    return summary
+
+
+def entity_data_from_node(request_id: str, entity: dict, path: str) -> dict:
+    """Map metadata node onto approval_entity column values."""
 
     entity_data = {
         'request_id': request_id,
         'entity_id': entity['id'],
         'entity_type': entity['type'],
         'parent_id': entity['parent'],
+        'path': path,
         'name': entity['name'],
         'uploaded_by': entity['owner'],
-        'uploaded_at': entity['created_time'],
+        'uploaded_at': cast(literal(entity['created_time'], String()), DateTime()),
+        'review_status': None,
+        'file_size': None,
+        'copy_status': None,
     }
     if entity['type'] == 'file':
         entity_data['review_status'] = 'pending'
         entity_data['file_size'] = entity['size']
         entity_data['copy_status'] = 'pending'
-    entity_obj = EntityModel(**entity_data)
-    db.session.add(entity_obj)
-    db.session.commit()
-    return entity_obj
+    return entity_data
+
+
+def _chunked(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def insert_entities_from_nodes(
+    session: AsyncSession,
+    request_id: str,
+    entities: list[dict],
+    known_paths: dict[str, str] | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """Insert entities in psql given meta using multi-row inserts without committing the transaction.
+
+    Batch size is capped so that a single insert, binding at most one parameter per column of each row, stays within
+    postgres limit of bind parameters. Returns number of inserted entities.
+    """
+
+    max_batch_size = MAX_BIND_PARAMETERS // len(EntityModel.__table__.columns)
+    batch_size = min(batch_size or ConfigClass.ENTITY_INSERT_BATCH_SIZE, max_batch_size)
+    paths = build_entity_paths(entities, known_paths)
+    total = 0
+    for chunk in _chunked(entities, batch_size):
+        rows = [entity_data_from_node(request_id, entity, paths[str(entity['id'])]) for entity in chunk]
+        await session.execute(insert(EntityModel).values(rows))
+        total += len(rows)
+    return total
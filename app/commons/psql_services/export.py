@@ -0,0 +1,68 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import csv
+import io
+from collections.abc import AsyncIterator
+from uuid import UUID
+
+import orjson
+from sqlalchemy import select
+
+from app.commons.database import database
+from app.config import ConfigClass
+from app.models.copy_request_sql import EntityModel
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+async def iter_request_entities(request_id: UUID) -> AsyncIterator[list[dict]]:
+    """Yield entities of the request in batches read from a server-side cursor.
+
+    Session is opened by the generator itself, so it stays open while the response is streamed.
+    """
+
+    query = (
+        select(EntityModel)
+        .where(EntityModel.request_id == request_id)
+        .order_by(EntityModel.path, EntityModel.id)
+        .execution_options(yield_per=ConfigClass.EXPORT_BATCH_SIZE)
+    )
+    async with database.session() as session:
+        result = await session.stream(query)
+        async for entities in result.scalars().partitions():
+            yield [entity.to_dict() for entity in entities]
+
+
+async def export_ndjson(request_id: UUID) -> AsyncIterator[bytes]:
+    async for entities in iter_request_entities(request_id):
+        yield b''.join(orjson.dumps(entity, option=orjson.OPT_APPEND_NEWLINE) for entity in entities)
+
+
+async def export_csv(request_id: UUID) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EntityModel.__table__.columns.keys())
+
+    def flush() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writeheader()
+    yield flush()
+    async for entities in iter_request_entities(request_id):
+        writer.writerows(entities)
+        yield flush()
+
+
+EXPORTERS = {
+    'ndjson': export_ndjson,
+    'csv': export_csv,
+}
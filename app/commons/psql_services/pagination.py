@@ -0,0 +1,173 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+from typing import NamedTuple
+
+from sqlalchemy import DateTime
+from sqlalchemy import and_
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.base import EAPIResponseCode
+from app.resources.error_handler import APIException
+
+
+class SortKey(NamedTuple):
+    """Column of keyset ordering.
+
+    Ordering follows postgres defaults, so nulls go last for ascending and first for descending direction.
+    """
+
+    column: InstrumentedAttribute
+    descending: bool = False
+
+    def order_by(self) -> ColumnElement:
+        return self.column.desc() if self.descending else self.column.asc()
+
+    def after(self, value: Any) -> ColumnElement:
+        if value is None:
+            return self.column.isnot(None) if self.descending else false()
+        if self.descending:
+            return self.column < value
+        return or_(self.column > value, self.column.is_(None))
+
+    def equal(self, value: Any) -> ColumnElement:
+        if value is None:
+            return self.column.is_(None)
+        return self.column == value
+
+    def decode(self, value: Any) -> Any:
+        if value is not None and isinstance(self.column.type, DateTime):
+            return datetime.fromisoformat(value)
+        return value
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(keys: list[SortKey], row: Any) -> str:
+    """Encode sort key values of the row into an opaque cursor."""
+
+    values = [getattr(row, key.column.key) for key in keys]
+    payload = json.dumps(values, default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(keys: list[SortKey], cursor: str) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError('Cursor does not match sort keys')
+        return [key.decode(value) for key, value in zip(keys, values)]
+    except (TypeError, ValueError):
+        raise APIException(EAPIResponseCode.bad_request.value, f'Invalid cursor: {cursor}')
+
+
+def keyset_filter(keys: list[SortKey], values: list[Any]) -> ColumnElement:
+    """Build condition selecting rows positioned after given sort key values."""
+
+    key, value = keys[0], values[0]
+    if len(keys) == 1:
+        return key.after(value)
+    return or_(key.after(value), and_(key.equal(value), keyset_filter(keys[1:], values[1:])))
+
+
+def paginate(query: Select, keys: list[SortKey], page: int, page_size: int, cursor: str | None = None) -> Select:
+    """Order query by sort keys and limit it to one page.
+
+    Page is located by cursor when it is provided, otherwise by page number offset.
+    """
+
+    query = query.order_by(*[key.order_by() for key in keys])
+    if cursor:
+        query = query.where(keyset_filter(keys, decode_cursor(keys, cursor)))
+    else:
+        query = query.offset(page * page_size)
+    return query.limit(page_size)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN statement returning planner estimates of the wrapped statement as json."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return f'EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}'
+
+
+async def estimate_count(session: AsyncSession, query: Select) -> int:
+    """Return number of rows matching the query as estimated by postgres planner without executing it."""
+
+    plan = (await session.execute(Explain(query.order_by(None)))).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_query(query: Select) -> Select:
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def paginate_with_total(
+    query: Select, keys: list[SortKey], page: int, page_size: int, cursor: str | None = None
+) -> Select:
+    """Paginate query with total number of matching rows selected as total column of every page row.
+
+    Total is computed by count(*) OVER () window. Keyset condition of cursor page would narrow that window, so total
+    is computed by an uncorrelated subquery instead, which postgres evaluates only once.
+    """
+
+    if cursor:
+        total_column = count_query(query).scalar_subquery()
+    else:
+        total_column = func.count().over()
+    return paginate(query.add_columns(total_column.label('total')), keys, page, page_size, cursor)
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select,
+    keys: list[SortKey],
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    approximate_total: bool = False,
+) -> tuple[list[Any], int]:
+    """Fetch one page of query results together with total number of matching rows.
+
+    Total is selected alongside page rows in a single round-trip. With approximate total rows are counted by planner
+    estimate rather than by a scan.
+    """
+
+    if approximate_total:
+        rows = (await session.execute(paginate(query, keys, page, page_size, cursor))).scalars().all()
+        return rows, await estimate_count(session, query)
+
+    rows = (await session.execute(paginate_with_total(query, keys, page, page_size, cursor))).all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total
+    if page or cursor:
+        return [], (await session.execute(count_query(query))).scalar()
+    return [], 0
@@ -7,6 +7,7 @@
 import logging
 from functools import lru_cache
 from typing import Any
+from typing import Literal
 
 from pydantic import BaseSettings
 from pydantic import Extra
@@ -35,6 +36,12 @@ class Settings(BaseSettings):
     RDS_USER: str = 'postgres'
     RDS_PASSWORD: str = 'postgres'
     RDS_PORT: str = '5432'
+    RDS_POOL_SIZE: int = 5
+    RDS_POOL_MAX_OVERFLOW: int = 10
+    RDS_POOL_TIMEOUT: float = 30.0
+    RDS_POOL_RECYCLE: int = 1800
+    RDS_POOL_PRE_PING: bool = True
+    RDS_STATEMENT_TIMEOUT: int = 30000
 
     REDIS_DB: int = 0
     REDIS_HOST: str = '127.0.0.1'
@@ -42,6 +49,48 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
 
     EMAIL_SUPPORT: str = 'random_email@not_a_host.not'
+    EMAIL_MULTI_RECIPIENT: bool = False
+
+    HTTP_TIMEOUT: float = 5.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 5.0
+    HTTP_SERVICE_MAX_CONNECTIONS: dict[str, int] = {}
+    HTTP2_ENABLED: bool = False
+
+    METADATA_BATCH_SIZE: int = 500
+    METADATA_BATCH_CONCURRENCY: int = 4
+    METADATA_BATCH_TRANSPORT: Literal['query', 'body'] = 'query'
+
+    ENTITY_INSERT_BATCH_SIZE: int = 1000
+    FOLDER_EXPANSION_CONCURRENCY: int = 8
+
+    ROUTING_CACHE_TTL: int = 300
+    ROUTING_CACHE_SIZE: int = 10000
+
+    EXPORT_BATCH_SIZE: int = 1000
+
+    METADATA_CACHE_TTL: int = 30
+    METADATA_CACHE_SIZE: int = 10000
+    METADATA_CACHE_REDIS_ENABLED: bool = False
+
+    AUTH_CACHE_TTL: int = 60
+    AUTH_CACHE_NEGATIVE_TTL: int = 10
+    AUTH_CACHE_SIZE: int = 1000
+
+    PROJECT_CACHE_TTL: int = 300
+    PROJECT_CACHE_SIZE: int = 1000
+
+    OUTBOX_POLL_INTERVAL: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BACKOFF: float = 2.0
+    OUTBOX_RETRY_MAX_BACKOFF: float = 300.0
+    OUTBOX_SHUTDOWN_TIMEOUT: float = 10.0
+    OUTBOX_LEASE_TIMEOUT: float = 60.0
+    OUTBOX_RETENTION: int = 604800
+    OUTBOX_PURGE_INTERVAL: float = 3600.0
 
     def __init__(self, *args: Any, **kwds: Any) -> None:
         super().__init__(*args, **kwds)
@@ -9,8 +9,13 @@ from fastapi import FastAPI
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi_sqlalchemy import DBSessionMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app.commons.database import database
+from app.commons.http_clients import http_clients
+from app.commons.meta_services.cache import node_cache
+from app.commons.outbox import outbox_dispatcher
+from app.commons.project_services import project_client
 from app.resources.error_handler import APIException
 
 from .api_registry import api_registry
@@ -20,12 +25,15 @@ from .config import ConfigClass
 def create_app():
     """Create app function."""
     app = FastAPI(
-        title='Service Approval', description='Service Approval', docs_url='/v1/api-doc', version=ConfigClass.version
+        title='Service Approval',
+        description='Service Approval',
+        docs_url='/v1/api-doc',
+        version=ConfigClass.version,
+        default_response_class=ORJSONResponse,
     )
 
     configure_logging(ConfigClass.LOGGING_LEVEL, ConfigClass.LOGGING_FORMAT)
 
-    app.add_middleware(DBSessionMiddleware, db_url=ConfigClass.DB_URI)
     app.add_middleware(
         CORSMiddleware,
         allow_origins='*',
@@ -36,6 +44,20 @@ def create_app():
 
     api_registry(app)
 
+    @app.on_event('startup')
+    async def startup():
+        await database.startup()
+        await http_clients.startup()
+        await outbox_dispatcher.startup()
+
+    @app.on_event('shutdown')
+    async def shutdown():
+        await outbox_dispatcher.shutdown()
+        await http_clients.shutdown()
+        await project_client.close()
+        await node_cache.close()
+        await database.shutdown()
+
     @app.exception_handler(APIException)
     async def http_exception_handler(request: Request, exc: APIException):
         return JSONResponse(
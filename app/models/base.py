@@ -6,7 +6,7 @@
 
 from enum import Enum
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 
@@ -26,16 +26,20 @@ class APIResponse(BaseModel):
     page: int = 0
     total: int = 1
     num_of_pages: int = 1
+    next_cursor: str | None = None
     result = []
 
     def json_response(self):
-        data = self.dict()
+        # fields are taken as they are, result is already built of plain values and needs no conversion by pydantic
+        data = dict(self)
         data['code'] = self.code.value
-        return JSONResponse(status_code=self.code.value, content=data)
+        return ORJSONResponse(status_code=self.code.value, content=data)
 
 
 class PaginationRequest(BaseModel):
     page: int = 0
     page_size: int = 25
+    cursor: str | None = None
+    approximate_total: bool = False
     order_type: str = 'asc'
     order_by: str = 'uploaded_at'
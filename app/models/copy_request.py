@@ -138,6 +138,43 @@ class GETPendingResponse(APIResponse):
     )
 
 
+class GETRequestSummary(BaseModel):
+    request_id: uuid.UUID
+
+
+class GETRequestSummaryResponse(APIResponse):
+    result: dict = Field(
+        {},
+        example={
+            'code': 200,
+            'error_msg': '',
+            'num_of_pages': 1,
+            'page': 0,
+            'result': {
+                'total': {'count': 3, 'size': 300},
+                'review_status': {
+                    'pending': {'count': 1, 'size': 100},
+                    'approved': {'count': 2, 'size': 200},
+                    'denied': {'count': 0, 'size': 0},
+                },
+                'copy_status': {'pending': {'count': 3, 'size': 300}, 'copied': {'count': 0, 'size': 0}},
+            },
+            'total': 1,
+        },
+    )
+
+
+class GETRequestExport(BaseModel):
+    request_id: uuid.UUID
+    format: str = 'ndjson'
+
+    @validator('format')
+    def valid_format(cls, value):
+        if value not in ['ndjson', 'csv']:
+            raise APIException(EAPIResponseCode.bad_request.value, 'invalid export format')
+        return value
+
+
 class PUTCopyStatus(BaseModel):
     entities: list[str]
     copy_status: str
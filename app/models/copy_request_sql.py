@@ -4,14 +4,20 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
+from collections.abc import Callable
 from datetime import datetime
+from operator import attrgetter
+from typing import Any
 from uuid import uuid4
 
 from sqlalchemy import BigInteger
 from sqlalchemy import Column
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import Integer
 from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -20,9 +26,40 @@ from app.config import ConfigClass
 Base = declarative_base()
 
 
+def _format_timestamp(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    return value.isoformat()[:-3] + 'Z'
+
+
+class _RowSerializer:
+    """Convert rows of a model into dictionaries with column accessors and converters resolved once per model."""
+
+    def __init__(self, columns: list[str], converters: dict[str, Callable[[Any], Any]]) -> None:
+        self.columns = tuple(columns)
+        self.values = attrgetter(*self.columns)
+        self.converters = tuple(converters.get(column) for column in self.columns)
+
+    def __call__(self, row: Any) -> dict[str, Any]:
+        return {
+            column: value if convert is None else convert(value)
+            for column, convert, value in zip(self.columns, self.converters, self.values(row))
+        }
+
+
 class RequestModel(Base):
     __tablename__ = 'approval_request'
-    __table_args__ = {'schema': ConfigClass.RDS_SCHEMA_DEFAULT}
+    __table_args__ = (
+        Index('ix_approval_request_project_code_status', 'project_code', 'status', 'submitted_at'),
+        Index(
+            'ix_approval_request_project_code_status_submitted_by',
+            'project_code',
+            'status',
+            'submitted_by',
+            'submitted_at',
+        ),
+        {'schema': ConfigClass.RDS_SCHEMA_DEFAULT},
+    )
     id = Column(UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
     status = Column(String())
     submitted_by = Column(String())
@@ -38,31 +75,39 @@ class RequestModel(Base):
     completed_at = Column(DateTime())
 
     def to_dict(self):
-        result = {}
-        for field in self.__table__.columns.keys():
-            if field in ['submitted_at', 'completed_at']:
-                if getattr(self, field):
-                    result[field] = str(getattr(self, field).isoformat()[:-3] + 'Z')
-                else:
-                    result[field] = None
-            elif field in ['id', 'destination_id', 'source_id']:
-                result[field] = str(getattr(self, field))
-            else:
-                result[field] = getattr(self, field)
-        return result
+        return _request_serializer(self)
 
 
 class EntityModel(Base):
     __tablename__ = 'approval_entity'
-    __table_args__ = {'schema': ConfigClass.RDS_SCHEMA_DEFAULT}
+    __table_args__ = (
+        Index('ix_approval_entity_request_id_parent_id', 'request_id', 'parent_id'),
+        Index('ix_approval_entity_request_id_review_status', 'request_id', 'review_status'),
+        Index('ix_approval_entity_request_id_entity_id', 'request_id', 'entity_id'),
+        Index('ix_approval_entity_request_id_path', 'request_id', 'path'),
+        Index(
+            'ix_approval_entity_name_trgm',
+            'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+        ),
+        Index(
+            'ix_approval_entity_uploaded_by_trgm',
+            'uploaded_by',
+            postgresql_using='gin',
+            postgresql_ops={'uploaded_by': 'gin_trgm_ops'},
+        ),
+        {'schema': ConfigClass.RDS_SCHEMA_DEFAULT},
+    )
     id = Column(UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
-    request_id = Column(UUID(as_uuid=True), ForeignKey(RequestModel.id))
+    request_id = Column(UUID(as_uuid=True), ForeignKey(RequestModel.id, ondelete='CASCADE'))
     entity_id = Column(UUID(as_uuid=True))
     entity_type = Column(String())
     review_status = Column(String())
     reviewed_by = Column(String())
     reviewed_at = Column(String())
     parent_id = Column(UUID(as_uuid=True))
+    path = Column(String(collation='C'))
     copy_status = Column(String())
     name = Column(String())
     uploaded_by = Column(String(), nullable=True)
@@ -70,12 +115,43 @@ class EntityModel(Base):
     file_size = Column(BigInteger(), nullable=True)
 
     def to_dict(self):
-        result = {}
-        for field in self.__table__.columns.keys():
-            if field == 'uploaded_at':
-                result[field] = str(getattr(self, field).isoformat()[:-3] + 'Z')
-            elif field in ['id', 'request_id', 'entity_id', 'parent_id']:
-                result[field] = str(getattr(self, field))
-            else:
-                result[field] = getattr(self, field)
-        return result
+        return _entity_serializer(self)
+
+
+class OutboxModel(Base):
+    __tablename__ = 'approval_outbox'
+    __table_args__ = (
+        Index('ix_approval_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+        {'schema': ConfigClass.RDS_SCHEMA_DEFAULT},
+    )
+    id = Column(UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4)
+    kind = Column(String(), nullable=False)
+    payload = Column(JSONB(), nullable=False)
+    status = Column(String(), nullable=False, default='pending')
+    attempts = Column(Integer(), nullable=False, default=0)
+    last_error = Column(String())
+    created_at = Column(DateTime(), default=datetime.utcnow)
+    next_attempt_at = Column(DateTime(), nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime())
+
+
+_request_serializer = _RowSerializer(
+    RequestModel.__table__.columns.keys(),
+    {
+        'submitted_at': _format_timestamp,
+        'completed_at': _format_timestamp,
+        'id': str,
+        'destination_id': str,
+        'source_id': str,
+    },
+)
+_entity_serializer = _RowSerializer(
+    EntityModel.__table__.columns.keys(),
+    {
+        'uploaded_at': _format_timestamp,
+        'id': str,
+        'request_id': str,
+        'entity_id': str,
+        'parent_id': str,
+    },
+)
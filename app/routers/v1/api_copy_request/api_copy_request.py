@@ -4,38 +4,53 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
+import asyncio
 import math
 from datetime import datetime
 
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import Request
-from fastapi_sqlalchemy import db
+from fastapi.responses import StreamingResponse
 from fastapi_utils import cbv
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.commons.database import get_db_session
 from app.commons.meta_services import bulk_get_by_ids
-from app.commons.meta_services import get_files_recursive
+from app.commons.meta_services import get_folders_files_recursive
 from app.commons.meta_services import get_node_by_id
 from app.commons.meta_services.models import MetadataItemStatus
-from app.commons.notification_service.client import Notification
-from app.commons.notification_service.client import NotificationServiceClient
 from app.commons.notification_service.models import CopyRequestAction
+from app.commons.outbox import outbox_dispatcher
 from app.commons.pipeline_ops.copy import trigger_copy_pipeline
-from app.commons.psql_services import create_entity_from_node
 from app.commons.psql_services import get_all_sub_files
 from app.commons.psql_services import get_all_sub_folder_nodes
 from app.commons.psql_services import get_files_until_top_parent
+from app.commons.psql_services import get_request_summary
+from app.commons.psql_services import get_routing
+from app.commons.psql_services import insert_entities_from_nodes
+from app.commons.psql_services import invalidate_routing
 from app.commons.psql_services import update_files_sql
-from app.config import ConfigClass
+from app.commons.psql_services.export import EXPORT_MEDIA_TYPES
+from app.commons.psql_services.export import EXPORTERS
+from app.commons.psql_services.pagination import SortKey
+from app.commons.psql_services.pagination import encode_cursor
+from app.commons.psql_services.pagination import fetch_page
 from app.logger import logger
 from app.models.base import APIResponse
 from app.models.base import EAPIResponseCode
 from app.models.copy_request import GETPendingResponse
 from app.models.copy_request import GETRequest
+from app.models.copy_request import GETRequestExport
 from app.models.copy_request import GETRequestFiles
 from app.models.copy_request import GETRequestFilesResponse
 from app.models.copy_request import GETRequestPending
 from app.models.copy_request import GETRequestResponse
+from app.models.copy_request import GETRequestSummary
+from app.models.copy_request import GETRequestSummaryResponse
 from app.models.copy_request import PATCHRequestFiles
 from app.models.copy_request import POSTRequest
 from app.models.copy_request import POSTRequestResponse
@@ -47,16 +62,19 @@ from app.models.copy_request import PUTRequestFilesResponse
 from app.models.copy_request_sql import EntityModel
 from app.models.copy_request_sql import RequestModel
 
-from .request_notify import notify_project_admins
-from .request_notify import notify_user
+from . import request_notify  # noqa: F401 registers outbox message handlers
 
 router = APIRouter()
 _API_TAG = 'CopyRequest'
 _API_NAMESPACE = 'copy_request'
 
+REQUEST_SORT_KEYS = [SortKey(RequestModel.submitted_at, descending=True), SortKey(RequestModel.id, descending=True)]
+
 
 @cbv.cbv(router)
 class APICopyRequest:
+    session: AsyncSession = Depends(get_db_session)
+
     @router.post(
         '/request/copy/{project_code}',
         tags=[_API_TAG],
@@ -67,8 +85,9 @@ class APICopyRequest:
         logger.info('Create Request called')
         api_response = APIResponse()
 
-        dest_folder_node = get_node_by_id(data.destination_id)
-        source_folder_node = get_node_by_id(data.source_id)
+        dest_folder_node, source_folder_node = await asyncio.gather(
+            get_node_by_id(data.destination_id), get_node_by_id(data.source_id)
+        )
         if dest_folder_node['parent_path']:
             dest_path = dest_folder_node['parent_path'] + '/' + dest_folder_node['name']
         else:
@@ -87,27 +106,35 @@ class APICopyRequest:
             'destination_path': dest_path,
             'source_path': source_path,
         }
-        request_obj = RequestModel(**request_data)
-        db.session.add(request_obj)
-        db.session.commit()
-        db.session.refresh(request_obj)
-
-        all_files = []
-        entities = await bulk_get_by_ids(data.entity_ids)
+        entities = await bulk_get_by_ids(data.entity_ids, use_cache=False)
         for entity in entities:
             entity['parent'] = None
-            all_files.append(entity)
-            if entity['type'] == 'folder':
-                auth = {
-                    'Authorization': request.headers.get('Authorization', ''),
-                }
-                all_files = all_files + get_files_recursive(entity, auth)
+        folders = [entity for entity in entities if entity['type'] == 'folder']
+        auth = {
+            'Authorization': request.headers.get('Authorization', ''),
+        }
+        # subtrees are fetched before the first query, so no connection is held during metadata round-trips
+        folders_files = await get_folders_files_recursive(folders, auth)
 
-        for entity in all_files:
-            create_entity_from_node(request_obj.id, entity)
+        request_obj = RequestModel(**request_data)
+        self.session.add(request_obj)
+        await self.session.flush()
+        known_paths = {}
+        await insert_entities_from_nodes(self.session, request_obj.id, entities, known_paths)
+        for files in folders_files:
+            await insert_entities_from_nodes(self.session, request_obj.id, files, known_paths)
+
+        outbox_dispatcher.enqueue(
+            self.session,
+            'notify_project_admins',
+            username=data.submitted_by,
+            project_code=project_code,
+            request_timestamp=request_obj.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+        await self.session.commit()
+        await self.session.refresh(request_obj)
+        outbox_dispatcher.wake()
 
-        submitted_at = request_obj.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
-        await notify_project_admins(data.submitted_by, project_code, submitted_at)
         api_response.result = request_obj.to_dict()
         return api_response.json_response()
 
@@ -117,37 +144,30 @@ class APICopyRequest:
         response_model=GETRequestResponse,
         summary='Create a copy request',
     )
-    def list_requests(self, project_code: str, params: GETRequest = Depends(GETRequest)):
+    async def list_requests(self, project_code: str, params: GETRequest = Depends(GETRequest)):
         logger.info('List Requests called')
         api_response = APIResponse()
-        results = db.session.query(RequestModel).filter_by(
+        results = select(RequestModel).filter_by(
             status=params.status,
             project_code=project_code,
         )
         if params.submitted_by:
             results = results.filter_by(submitted_by=params.submitted_by)
-        results = results.order_by(RequestModel.submitted_at.desc()).limit(params.page_size)
-        results = results.offset(params.page * params.page_size)
-
-        if params.submitted_by:
-            total = (
-                db.session.query(RequestModel)
-                .filter_by(status=params.status, project_code=project_code, submitted_by=params.submitted_by)
-                .count()
-            )
-        else:
-            total = (
-                db.session.query(RequestModel)
-                .filter_by(
-                    status=params.status,
-                    project_code=project_code,
-                )
-                .count()
-            )
+        results, total = await fetch_page(
+            self.session,
+            results,
+            REQUEST_SORT_KEYS,
+            params.page,
+            params.page_size,
+            params.cursor,
+            params.approximate_total,
+        )
         api_response.result = [i.to_dict() for i in results]
         api_response.total = total
         api_response.page = params.page
         api_response.num_of_pages = math.ceil(total / params.page_size)
+        if len(results) == params.page_size:
+            api_response.next_cursor = encode_cursor(REQUEST_SORT_KEYS, results[-1])
         return api_response.json_response()
 
     @router.get(
@@ -156,7 +176,7 @@ class APICopyRequest:
         response_model=GETRequestFilesResponse,
         summary='List request files',
     )
-    def list_request_files(self, project_code: str, params: GETRequestFiles = Depends(GETRequestFiles)):
+    async def list_request_files(self, project_code: str, params: GETRequestFiles = Depends(GETRequestFiles)):
         logger.info('List request files called')
         api_response = APIResponse()
         query_params = {'request_id': params.request_id}
@@ -165,38 +185,32 @@ class APICopyRequest:
         else:
             query_params['parent_id'] = None
 
-        sql_query = db.session.query(EntityModel)
+        sql_query = select(EntityModel)
         for key, value in params.query.items():
             if key in params.partial:
                 sql_query = sql_query.filter(getattr(EntityModel, key).contains(value))
             else:
                 query_params[key] = value
 
-        if params.order_type == 'desc':
-            order_by = getattr(EntityModel, params.order_by).desc()
-        else:
-            order_by = getattr(EntityModel, params.order_by).asc()
-        sql_query = sql_query.filter_by(**query_params).order_by(EntityModel.entity_type.desc(), order_by)
-
-        results = sql_query.limit(params.page_size).offset(params.page * params.page_size)
+        sort_keys = [
+            SortKey(EntityModel.entity_type, descending=True),
+            SortKey(getattr(EntityModel, params.order_by), descending=params.order_type == 'desc'),
+            SortKey(EntityModel.id),
+        ]
+        sql_query = sql_query.filter_by(**query_params)
+        results, total = await fetch_page(
+            self.session, sql_query, sort_keys, params.page, params.page_size, params.cursor, params.approximate_total
+        )
         routing = []
         if params.parent_id:
-            entity_id = params.parent_id
-            while entity_id:
-                file = (
-                    db.session.query(EntityModel).filter_by(request_id=params.request_id, entity_id=entity_id).first()
-                )
-                if file:
-                    routing.append(file.to_dict())
-                    entity_id = file.parent_id
-                else:
-                    entity_id = None
+            routing = await get_routing(self.session, params.request_id, params.parent_id)
 
-        total = db.session.query(EntityModel).filter_by(**query_params).count()
         api_response.result = {'data': [i.to_dict() for i in results], 'routing': routing}
         api_response.total = total
         api_response.page = params.page
         api_response.num_of_pages = math.ceil(total / params.page_size)
+        if len(results) == params.page_size:
+            api_response.next_cursor = encode_cursor(sort_keys, results[-1])
         return api_response.json_response()
 
     @router.put(
@@ -210,37 +224,41 @@ class APICopyRequest:
         api_response = APIResponse()
         review_status = data.review_status
 
-        approved = db.session.query(EntityModel).filter_by(request_id=data.request_id, review_status='approved')
-        denied = db.session.query(EntityModel).filter_by(request_id=data.request_id, review_status='denied')
-        skipped_data = {'approved': approved.count(), 'denied': denied.count()}
+        query = (
+            select(EntityModel.review_status, func.count())
+            .where(EntityModel.request_id == data.request_id, EntityModel.review_status.in_(['approved', 'denied']))
+            .group_by(EntityModel.review_status)
+        )
+        review_counts = dict((await self.session.execute(query)).all())
+        skipped_data = {'approved': review_counts.get('approved', 0), 'denied': review_counts.get('denied', 0)}
+
+        query = select(EntityModel.entity_id).filter_by(request_id=data.request_id, review_status='pending')
+        file_ids = list((await self.session.execute(query)).scalars())
+        file_folder_ids = await get_files_until_top_parent(self.session, data.request_id, file_ids)
+        query = select(EntityModel.entity_id).filter_by(request_id=data.request_id, parent_id=None)
+        top_level_ids = [str(entity_id) for entity_id in (await self.session.execute(query)).scalars()]
+        request_obj: RequestModel = await self.session.get(RequestModel, data.request_id)
+        if len(file_ids) != 0:
+            outbox_dispatcher.enqueue(
+                self.session,
+                'copy_request_notification',
+                recipient_username=request_obj.submitted_by,
+                include_ids=top_level_ids,
+                initiator_username=data.username,
+                source_id=request_obj.source_id,
+                destination_id=request_obj.destination_id,
+                project_code=project_code,
+                action=CopyRequestAction.APPROVAL if review_status == 'approved' else CopyRequestAction.DENIAL,
+                request_id=data.request_id,
+            )
 
-        entities = db.session.query(EntityModel).filter_by(request_id=data.request_id, review_status='pending')
-        file_ids = [i.entity_id for i in entities]
-        file_folder_ids = get_files_until_top_parent(data.request_id, file_ids)
         review_data = {
             'review_status': review_status,
             'reviewed_by': data.username,
-            'reviewed_at': datetime.utcnow(),
+            'reviewed_at': str(datetime.utcnow()),
         }
-        result = update_files_sql(data.request_id, review_data, file_ids)
-
-        top_level_entities = db.session.query(EntityModel).filter_by(request_id=data.request_id, parent_id=None)
-        top_level_ids = [str(i.entity_id) for i in top_level_entities]
-        request_obj: RequestModel = db.session.query(RequestModel).get(data.request_id)
-        if len(file_ids) != 0:
-            notification = Notification(
-                request_obj.submitted_by,
-                top_level_ids,
-                data.username,
-                request_obj.source_id,
-                request_obj.destination_id,
-                project_code,
-                CopyRequestAction.APPROVAL if review_status == 'approved' else CopyRequestAction.DENIAL,
-                data.request_id,
-            )
-            notification_client = NotificationServiceClient(ConfigClass.NOTIFICATION_SERVICE)
-            notification_object = await notification.to_copy_request_notification()
-            await notification_client.send_notification(notification_object)
+        updated = await update_files_sql(self.session, data.request_id, review_data, file_ids)
+        outbox_dispatcher.wake()
 
         if review_status == 'approved' and len(file_ids) != 0:
             if top_level_ids:
@@ -262,7 +280,7 @@ class APICopyRequest:
                 )
                 logger.info(f'Pipeline trigger for {len(copy_result)} files')
 
-        skipped_data['updated'] = result.count()
+        skipped_data['updated'] = updated
         api_response.result = skipped_data
         return api_response.json_response()
 
@@ -277,33 +295,33 @@ class APICopyRequest:
         api_response = APIResponse()
         review_status = data.review_status
 
-        approved = get_all_sub_folder_nodes(data.request_id, data.entity_ids, 'approved')
-        denied = get_all_sub_folder_nodes(data.request_id, data.entity_ids, 'denied')
+        approved = await get_all_sub_folder_nodes(self.session, data.request_id, data.entity_ids, 'approved')
+        denied = await get_all_sub_folder_nodes(self.session, data.request_id, data.entity_ids, 'denied')
         skipped_data = {'approved': len(approved), 'denied': len(denied)}
-        file_ids = get_all_sub_files(data.request_id, data.entity_ids)
-        file_folder_ids = get_files_until_top_parent(data.request_id, file_ids)
+        file_ids = await get_all_sub_files(self.session, data.request_id, data.entity_ids)
+        file_folder_ids = await get_files_until_top_parent(self.session, data.request_id, file_ids)
+        request_obj: RequestModel = await self.session.get(RequestModel, data.request_id)
+        if len(file_ids) != 0:
+            outbox_dispatcher.enqueue(
+                self.session,
+                'copy_request_notification',
+                recipient_username=request_obj.submitted_by,
+                include_ids=data.entity_ids,
+                initiator_username=data.username,
+                source_id=request_obj.source_id,
+                destination_id=request_obj.destination_id,
+                project_code=project_code,
+                action=CopyRequestAction.APPROVAL if review_status == 'approved' else CopyRequestAction.DENIAL,
+                request_id=data.request_id,
+            )
+
         review_data = {
             'review_status': review_status,
             'reviewed_by': data.username,
-            'reviewed_at': datetime.utcnow(),
+            'reviewed_at': str(datetime.utcnow()),
         }
-        result = update_files_sql(data.request_id, review_data, file_ids)
-
-        request_obj: RequestModel = db.session.query(RequestModel).get(data.request_id)
-        if len(file_ids) != 0:
-            notification = Notification(
-                request_obj.submitted_by,
-                data.entity_ids,
-                data.username,
-                request_obj.source_id,
-                request_obj.destination_id,
-                project_code,
-                CopyRequestAction.APPROVAL if review_status == 'approved' else CopyRequestAction.DENIAL,
-                data.request_id,
-            )
-            notification_client = NotificationServiceClient(ConfigClass.NOTIFICATION_SERVICE)
-            notification_object = await notification.to_copy_request_notification()
-            await notification_client.send_notification(notification_object)
+        updated = await update_files_sql(self.session, data.request_id, review_data, file_ids)
+        outbox_dispatcher.wake()
 
         if review_status == 'approved' and len(file_ids) != 0:
             if data.entity_ids:
@@ -323,7 +341,7 @@ class APICopyRequest:
                     file_folder_ids,
                 )
                 logger.info(f'Pipeline trigger for {len(copy_result)} files')
-        skipped_data['updated'] = result.count()
+        skipped_data['updated'] = updated
         api_response.result = skipped_data
         return api_response.json_response()
 
@@ -334,16 +352,16 @@ class APICopyRequest:
         logger.info('Complete request called')
         api_response = APIResponse()
 
-        request_obj = db.session.query(RequestModel).get(data.request_id)
-
         query_params = {
             'request_id': data.request_id,
             'review_status': 'pending',
         }
-        pending_files = db.session.query(EntityModel).filter_by(**query_params)
-        if pending_files.count():
-            pending_entities = [str(i.entity_id) for i in pending_files]
-            pending_nodes = await bulk_get_by_ids(pending_entities)
+        query = select(EntityModel.entity_id).filter_by(**query_params)
+        pending_entities = [str(entity_id) for entity_id in (await self.session.execute(query)).scalars()]
+        # connection is returned to the pool while statuses are looked up in metadata service
+        await self.session.commit()
+        if pending_entities:
+            pending_nodes = await bulk_get_by_ids(pending_entities, use_cache=False)
             for entity in pending_nodes:
                 if entity['status'] == MetadataItemStatus.ARCHIVED:
                     pending_entities.remove(entity['id'])
@@ -359,35 +377,40 @@ class APICopyRequest:
                 api_response.code = EAPIResponseCode.bad_request
                 return api_response.json_response()
 
+        request_obj = await self.session.get(RequestModel, data.request_id)
         request_obj.status = data.status
         request_obj.review_notes = data.review_notes
         request_obj.completed_by = data.username
         request_obj.completed_at = datetime.utcnow()
-        db.session.commit()
-        db.session.refresh(request_obj)
+        outbox_dispatcher.enqueue(
+            self.session,
+            'notify_user',
+            username=request_obj.submitted_by,
+            admin_username=data.username,
+            project_code=project_code,
+            request_timestamp=request_obj.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+            complete_timestamp=request_obj.completed_at.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+        outbox_dispatcher.enqueue(
+            self.session,
+            'copy_request_notification',
+            recipient_username=request_obj.submitted_by,
+            include_ids=None,
+            initiator_username=data.username,
+            source_id=None,
+            destination_id=None,
+            project_code=project_code,
+            action=CopyRequestAction.CLOSE,
+            request_id=data.request_id,
+        )
+        await self.session.commit()
+        outbox_dispatcher.wake()
 
-        submitted_at = request_obj.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
-        completed_at = request_obj.completed_at.strftime('%Y-%m-%d %H:%M:%S')
-        await notify_user(request_obj.submitted_by, data.username, project_code, submitted_at, completed_at)
         api_response.result = {
             'status': data.status,
             'pending_entities': [],
             'pending_count': 0,
         }
-        notification = Notification(
-            request_obj.submitted_by,
-            None,
-            data.username,
-            None,
-            None,
-            project_code,
-            CopyRequestAction.CLOSE,
-            data.request_id,
-        )
-        notification_client = NotificationServiceClient(ConfigClass.NOTIFICATION_SERVICE)
-        notification_object = await notification.to_copy_request_notification()
-        await notification_client.send_notification(notification_object)
-
         return api_response.json_response()
 
     @router.get(
@@ -404,11 +427,12 @@ class APICopyRequest:
             'request_id': params.request_id,
             'review_status': 'pending',
         }
-        pending_files = db.session.query(EntityModel).filter_by(**query_params)
-        logger.info(f'{pending_files.count()} pending files in request')
-        pending_entities = [str(i.entity_id) for i in pending_files]
+        query = select(EntityModel.entity_id).filter_by(**query_params)
+        pending_entities = [str(entity_id) for entity_id in (await self.session.execute(query)).scalars()]
+        await self.session.commit()
+        logger.info(f'{len(pending_entities)} pending files in request')
         if pending_entities:
-            pending_nodes = await bulk_get_by_ids(pending_entities)
+            pending_nodes = await bulk_get_by_ids(pending_entities, use_cache=False)
             for entity in pending_nodes:
                 if entity['status'] == MetadataItemStatus.ARCHIVED:
                     pending_entities.remove(entity['id'])
@@ -418,17 +442,49 @@ class APICopyRequest:
         }
         return api_response.json_response()
 
+    @router.get(
+        '/request/copy/{project_code}/summary',
+        tags=[_API_TAG],
+        response_model=GETRequestSummaryResponse,
+        summary='Get file counts and sizes per review and copy status',
+    )
+    async def get_summary(self, project_code: str, params: GETRequestSummary = Depends(GETRequestSummary)):
+        logger.info('Get Summary called')
+        api_response = APIResponse()
+        api_response.result = await get_request_summary(self.session, params.request_id)
+        return api_response.json_response()
+
+    @router.get(
+        '/request/copy/{project_code}/export',
+        tags=[_API_TAG],
+        summary='Stream all files of request as NDJSON or CSV',
+    )
+    async def export_request_files(self, project_code: str, params: GETRequestExport = Depends(GETRequestExport)):
+        logger.info('Export request files called')
+        if await self.session.get(RequestModel, params.request_id) is None:
+            api_response = APIResponse()
+            api_response.code = EAPIResponseCode.not_found
+            api_response.error_msg = f'Request {params.request_id} not found'
+            return api_response.json_response()
+        # request session is closed only after the response is streamed, export reads entities on its own session
+        await self.session.close()
+
+        headers = {'Content-Disposition': f'attachment; filename="{params.request_id}.{params.format}"'}
+        return StreamingResponse(
+            EXPORTERS[params.format](params.request_id), media_type=EXPORT_MEDIA_TYPES[params.format], headers=headers
+        )
+
     @router.delete('/request/copy/{project_code}/delete/{request_id}', tags=[_API_TAG], summary='Delete Request')
-    def delete_request(self, project_code: str, request_id: str):
+    async def delete_request(self, project_code: str, request_id: str):
         api_response = APIResponse()
-        request_files = db.session.query(EntityModel).filter_by(request_id=request_id)
-        for request_file in request_files:
-            db.session.delete(request_file)
-        db.session.commit()
-
-        request_obj = db.session.query(RequestModel).get(request_id)
-        db.session.delete(request_obj)
-        db.session.commit()
+        # entities are removed by ON DELETE CASCADE of approval_entity.request_id
+        result = await self.session.execute(delete(RequestModel).where(RequestModel.id == request_id))
+        await self.session.commit()
+        invalidate_routing(request_id)
+        if not result.rowcount:
+            api_response.code = EAPIResponseCode.not_found
+            api_response.error_msg = f'Request {request_id} not found'
+            return api_response.json_response()
         api_response.result = 'success'
         return api_response.json_response()
 
@@ -438,11 +494,15 @@ class APICopyRequest:
         response_model=PUTCopyStatusResponse,
         summary='Update file copy status',
     )
-    def update_copy_status(self, request_id: str, data: PUTCopyStatus):
+    async def update_copy_status(self, request_id: str, data: PUTCopyStatus):
         api_response = PUTCopyStatusResponse()
         try:
             updated_data = {'copy_status': data.copy_status}
-            result = update_files_sql(request_id, updated_data, data.entities)
+            await update_files_sql(self.session, request_id, updated_data, data.entities)
+            query = select(EntityModel).where(
+                EntityModel.request_id == request_id, EntityModel.entity_id.in_(data.entities)
+            )
+            result = (await self.session.execute(query)).scalars()
             api_response.result = [i.to_dict() for i in result]
         except Exception as e:
             logger.error(f'Update copy status failed due to: {e}')
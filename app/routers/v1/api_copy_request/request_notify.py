@@ -4,53 +4,77 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
-import httpx
-
+from app.commons.auth_services import get_project_admins
+from app.commons.auth_services import get_user
+from app.commons.database import database
+from app.commons.notification_service.client import Notification
+from app.commons.notification_service.client import NotificationServiceClient
+from app.commons.notification_service.models import CopyRequestAction
 from app.commons.notifier_service.email_service import SrvEmail
+from app.commons.outbox import outbox_dispatcher
 from app.commons.project_services import query_project
 from app.config import ConfigClass
 
-
-async def get_user(username: str) -> dict:
-    query = {
-        'username': username,
-        'exact': True,
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(ConfigClass.AUTH_SERVICE + 'admin/user', params=query)
-    if response.status_code != 200:
-        raise Exception(f'Error getting user {username} from auth service: ' + str(response.json()))
-    return response.json()['result']
+NEW_REQUEST_SUBJECT = 'A new request to copy data to Core needs your approval'
+NEW_REQUEST_TEMPLATE = 'copy_request/new_request.html'
 
 
+@outbox_dispatcher.handler('notify_project_admins')
 async def notify_project_admins(username: str, project_code: str, request_timestamp: str):
+    """Fan out new copy request email to project admins.
+
+    One outbox message is enqueued per admin, so a failed email is retried alone and admins who already received it
+    are not emailed again. With multi recipient mode enabled a single email addressed to all admins is sent instead.
+    """
+
     user_node = await get_user(username)
     project = await query_project(project_code)
-    payload = {
-        'role_names': [f'{project_code}-admin'],
-        'status': 'active',
+    project_admins = await get_project_admins(project_code)
+    if not project_admins:
+        return
+
+    template_kwargs = {
+        'user_first_name': user_node.get('first_name', user_node['username']),
+        'user_last_name': user_node.get('last_name'),
+        'project_name': project.name,
+        'request_timestamp': request_timestamp,
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(ConfigClass.AUTH_SERVICE + 'admin/roles/users', json=payload)
-    project_admins = response.json()['result']
-    for project_admin in project_admins:
-        email_service = SrvEmail()
-        await email_service.send(
-            'A new request to copy data to Core needs your approval',
-            project_admin['email'],
-            ConfigClass.EMAIL_SUPPORT,
-            msg_type='html',
-            template='copy_request/new_request.html',
-            template_kwargs={
-                'admin_first_name': project_admin.get('first_name', project_admin['username']),
-                'user_first_name': user_node.get('first_name', user_node['username']),
-                'user_last_name': user_node.get('last_name'),
-                'project_name': project.name,
-                'request_timestamp': request_timestamp,
-            },
+    if ConfigClass.EMAIL_MULTI_RECIPIENT:
+        await notify_project_admin(
+            [project_admin['email'] for project_admin in project_admins],
+            {'admin_first_name': 'Administrator', **template_kwargs},
         )
+        return
+
+    async with database.session() as session:
+        for project_admin in project_admins:
+            outbox_dispatcher.enqueue(
+                session,
+                'notify_project_admin',
+                receiver=project_admin['email'],
+                template_kwargs={
+                    'admin_first_name': project_admin.get('first_name', project_admin['username']),
+                    **template_kwargs,
+                },
+            )
+        await session.commit()
+    outbox_dispatcher.wake()
+
+
+@outbox_dispatcher.handler('notify_project_admin')
+async def notify_project_admin(receiver: str | list[str], template_kwargs: dict):
+    email_service = SrvEmail()
+    await email_service.send(
+        NEW_REQUEST_SUBJECT,
+        receiver,
+        ConfigClass.EMAIL_SUPPORT,
+        msg_type='html',
+        template=NEW_REQUEST_TEMPLATE,
+        template_kwargs=template_kwargs,
+    )
 
 
+@outbox_dispatcher.handler('notify_user')
 async def notify_user(
     username: str, admin_username: str, project_code: str, request_timestamp: str, complete_timestamp: str
 ):
@@ -73,3 +97,29 @@ async def notify_user(
             'project_name': project.name,
         },
     )
+
+
+@outbox_dispatcher.handler('copy_request_notification')
+async def send_copy_request_notification(
+    recipient_username: str,
+    include_ids: list[str] | None,
+    initiator_username: str,
+    source_id: str | None,
+    destination_id: str | None,
+    project_code: str,
+    action: str,
+    request_id: str,
+):
+    notification = Notification(
+        recipient_username,
+        include_ids,
+        initiator_username,
+        source_id,
+        destination_id,
+        project_code,
+        CopyRequestAction(action),
+        request_id,
+    )
+    notification_client = NotificationServiceClient(ConfigClass.NOTIFICATION_SERVICE)
+    notification_object = await notification.to_copy_request_notification()
+    await notification_client.send_notification(notification_object)
@@ -6,10 +6,14 @@
 
 from aioredis import StrictRedis
 from fastapi import APIRouter
+from fastapi import Depends
 from fastapi.responses import Response
-from fastapi_sqlalchemy import db
 from fastapi_utils import cbv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.commons.database import database
+from app.commons.database import get_db_session
 from app.config import ConfigClass
 from app.logger import logger
 from app.models.copy_request_sql import RequestModel
@@ -18,9 +22,9 @@ from app.resources.error_handler import APIException
 router = APIRouter(tags=['Health'])
 
 
-async def db_health_check():
+async def db_health_check(session: AsyncSession):
     try:
-        db.session.query(RequestModel).first()
+        await session.execute(select(RequestModel).limit(1))
     except Exception as e:
         error_msg = f'Could not connect to pilot_approval.approval_request table: {e}'
         logger.error(error_msg)
@@ -43,12 +47,21 @@ async def redis_health_check():
 
 @cbv.cbv(router)
 class Health:
+    session: AsyncSession = Depends(get_db_session)
+
     @router.get(
         '/health/',
         summary='Health check',
     )
     async def get(self):
         logger.info('Starting api_health checks for approval service')
-        await db_health_check()
+        await db_health_check(self.session)
         await redis_health_check()
         return Response(status_code=204)
+
+    @router.get(
+        '/health/db-pool/',
+        summary='Database connection pool metrics',
+    )
+    async def db_pool(self):
+        return database.pool_status()
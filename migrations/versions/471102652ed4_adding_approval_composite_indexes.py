@@ -0,0 +1,49 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+"""Adding approval composite indexes.
+
+Revision ID: 471102652ed4
+Revises: aba13320f1c8
+Create Date: 2026-10-18 11:03:27.815290
+"""
+from alembic import op
+
+revision = '471102652ed4'
+down_revision = 'aba13320f1c8'
+branch_labels = None
+depends_on = None
+
+ENTITY_INDEXES = {
+    'ix_approval_entity_request_id_parent_id': ['request_id', 'parent_id'],
+    'ix_approval_entity_request_id_review_status': ['request_id', 'review_status'],
+    'ix_approval_entity_request_id_entity_id': ['request_id', 'entity_id'],
+}
+
+REQUEST_INDEXES = {
+    'ix_approval_request_project_code_status': ['project_code', 'status', 'submitted_at'],
+    'ix_approval_request_project_code_status_submitted_by': ['project_code', 'status', 'submitted_by', 'submitted_at'],
+}
+
+
+def upgrade():
+    # indexes are built concurrently, so writes are not blocked while they are built
+    with op.get_context().autocommit_block():
+        for name, columns in ENTITY_INDEXES.items():
+            op.create_index(
+                name, 'approval_entity', columns, unique=False, schema='pilot_approval', postgresql_concurrently=True
+            )
+        for name, columns in REQUEST_INDEXES.items():
+            op.create_index(
+                name, 'approval_request', columns, unique=False, schema='pilot_approval', postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in REQUEST_INDEXES:
+            op.drop_index(name, table_name='approval_request', schema='pilot_approval', postgresql_concurrently=True)
+        for name in ENTITY_INDEXES:
+            op.drop_index(name, table_name='approval_entity', schema='pilot_approval', postgresql_concurrently=True)
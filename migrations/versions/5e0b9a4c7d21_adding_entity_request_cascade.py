@@ -0,0 +1,46 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+"""Adding entity request cascade.
+
+Revision ID: 5e0b9a4c7d21
+Revises: c3f1d8a27b64
+Create Date: 2026-10-18 17:12:45.301862
+"""
+from alembic import op
+
+revision = '5e0b9a4c7d21'
+down_revision = 'c3f1d8a27b64'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT_NAME = 'approval_entity_request_id_fkey'
+
+
+def upgrade():
+    op.drop_constraint(CONSTRAINT_NAME, 'approval_entity', schema='pilot_approval', type_='foreignkey')
+    op.create_foreign_key(
+        CONSTRAINT_NAME,
+        'approval_entity',
+        'approval_request',
+        ['request_id'],
+        ['id'],
+        source_schema='pilot_approval',
+        referent_schema='pilot_approval',
+        ondelete='CASCADE',
+    )
+
+
+def downgrade():
+    op.drop_constraint(CONSTRAINT_NAME, 'approval_entity', schema='pilot_approval', type_='foreignkey')
+    op.create_foreign_key(
+        CONSTRAINT_NAME,
+        'approval_entity',
+        'approval_request',
+        ['request_id'],
+        ['id'],
+        source_schema='pilot_approval',
+        referent_schema='pilot_approval',
+    )
@@ -0,0 +1,45 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+"""Adding entity trigram indexes.
+
+Revision ID: 8d2f6b1e9a43
+Revises: 5e0b9a4c7d21
+Create Date: 2026-10-18 18:04:51.226417
+"""
+from alembic import op
+
+revision = '8d2f6b1e9a43'
+down_revision = '5e0b9a4c7d21'
+branch_labels = None
+depends_on = None
+
+ENTITY_INDEXES = {
+    'ix_approval_entity_name_trgm': 'name',
+    'ix_approval_entity_uploaded_by_trgm': 'uploaded_by',
+}
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # indexes are built concurrently, so writes are not blocked while they are built
+    with op.get_context().autocommit_block():
+        for name, column in ENTITY_INDEXES.items():
+            op.create_index(
+                name,
+                'approval_entity',
+                [column],
+                unique=False,
+                schema='pilot_approval',
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ENTITY_INDEXES:
+            op.drop_index(name, table_name='approval_entity', schema='pilot_approval', postgresql_concurrently=True)
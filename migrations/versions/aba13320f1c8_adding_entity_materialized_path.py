@@ -0,0 +1,76 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+"""Adding entity materialized path.
+
+Revision ID: aba13320f1c8
+Revises: 396048c16b59
+Create Date: 2026-10-18 09:12:41.503127
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'aba13320f1c8'
+down_revision = '396048c16b59'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_REQUEST_PATHS = sa.text(
+    """
+    WITH RECURSIVE tree AS (
+        SELECT entity.id, entity.request_id, entity.entity_id, entity.entity_id::text AS path
+        FROM pilot_approval.approval_entity entity
+        WHERE entity.request_id = :request_id AND NOT EXISTS (
+            SELECT 1
+            FROM pilot_approval.approval_entity parent
+            WHERE parent.request_id = entity.request_id AND parent.entity_id = entity.parent_id
+        )
+        UNION ALL
+        SELECT child.id, child.request_id, child.entity_id, tree.path || '/' || child.entity_id::text
+        FROM pilot_approval.approval_entity child
+        JOIN tree ON child.request_id = tree.request_id AND child.parent_id = tree.entity_id
+        WHERE child.entity_id::text <> ALL (string_to_array(tree.path, '/'))
+    )
+    UPDATE pilot_approval.approval_entity entity
+    SET path = tree.path
+    FROM tree
+    WHERE entity.id = tree.id
+    """
+)
+
+
+def upgrade():
+    op.add_column(
+        'approval_entity', sa.Column('path', sa.String(collation='C'), nullable=True), schema='pilot_approval'
+    )
+    # index is built concurrently before the backfill, so writes are not blocked and every request is backfilled
+    # through the index in a short transaction of its own instead of one update over the whole table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_approval_entity_request_id_path',
+            'approval_entity',
+            ['request_id', 'path'],
+            unique=False,
+            schema='pilot_approval',
+            postgresql_concurrently=True,
+        )
+        connection = op.get_bind()
+        request_ids = connection.execute(
+            sa.text('SELECT DISTINCT request_id FROM pilot_approval.approval_entity WHERE request_id IS NOT NULL')
+        ).scalars()
+        for request_id in request_ids.all():
+            connection.execute(BACKFILL_REQUEST_PATHS, {'request_id': request_id})
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_approval_entity_request_id_path',
+            table_name='approval_entity',
+            schema='pilot_approval',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('approval_entity', 'path', schema='pilot_approval')
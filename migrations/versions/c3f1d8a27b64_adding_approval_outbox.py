@@ -0,0 +1,49 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+"""Adding approval outbox.
+
+Revision ID: c3f1d8a27b64
+Revises: 471102652ed4
+Create Date: 2026-10-18 15:58:02.114730
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = 'c3f1d8a27b64'
+down_revision = '471102652ed4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'approval_outbox',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        schema='pilot_approval',
+    )
+    op.create_index(
+        'ix_approval_outbox_status_next_attempt_at',
+        'approval_outbox',
+        ['status', 'next_attempt_at'],
+        unique=False,
+        schema='pilot_approval',
+    )
+
+
+def downgrade():
+    op.drop_index('ix_approval_outbox_status_next_attempt_at', table_name='approval_outbox', schema='pilot_approval')
+    op.drop_table('approval_outbox', schema='pilot_approval')
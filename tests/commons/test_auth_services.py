@@ -0,0 +1,66 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import pytest
+
+from app.commons.auth_services import get_project_admins
+from app.commons.auth_services import get_user
+from app.config import ConfigClass
+from tests.conftest import USER_DATA
+
+USER_URL = ConfigClass.AUTH_SERVICE + 'admin/user?username=greg&exact=true'
+ROLES_URL = ConfigClass.AUTH_SERVICE + 'admin/roles/users'
+
+
+@pytest.fixture
+def enable_auth_cache(mocker):
+    mocker.patch.object(ConfigClass, 'AUTH_CACHE_TTL', 60)
+    mocker.patch.object(ConfigClass, 'AUTH_CACHE_NEGATIVE_TTL', 10)
+
+
+@pytest.mark.asyncio
+async def test_get_user_serves_user_from_cache(started_http_clients, enable_auth_cache, httpx_mock):
+    httpx_mock.add_response(method='GET', url=USER_URL, json={'result': USER_DATA})
+
+    await get_user('greg')
+    user = await get_user('greg')
+
+    assert user == USER_DATA
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_user_caches_unknown_user(started_http_clients, enable_auth_cache, httpx_mock):
+    httpx_mock.add_response(method='GET', url=USER_URL, json={'error_msg': 'User not found'}, status_code=404)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await get_user('greg')
+
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_user_does_not_cache_auth_service_error(started_http_clients, enable_auth_cache, httpx_mock):
+    httpx_mock.add_response(method='GET', url=USER_URL, json={'error_msg': 'Internal error'}, status_code=500)
+    httpx_mock.add_response(method='GET', url=USER_URL, json={'result': USER_DATA})
+
+    with pytest.raises(Exception):
+        await get_user('greg')
+
+    assert await get_user('greg') == USER_DATA
+
+
+@pytest.mark.asyncio
+async def test_get_project_admins_serves_admins_from_cache(started_http_clients, enable_auth_cache, httpx_mock):
+    admins = [{'email': 'admin@test.com', 'username': 'admin'}]
+    httpx_mock.add_response(method='POST', url=ROLES_URL, json={'result': admins})
+
+    await get_project_admins('testproject')
+    project_admins = await get_project_admins('testproject')
+
+    assert project_admins == admins
+    assert len(httpx_mock.get_requests()) == 1
@@ -0,0 +1,103 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import re
+from uuid import uuid4
+
+import pytest
+
+from app.commons.cache import TTLCache
+from app.commons.meta_services import bulk_get_by_ids
+from app.commons.meta_services import get_node_by_id
+from app.commons.meta_services.cache import node_cache
+from app.config import ConfigClass
+from tests.conftest import FILE_DATA
+from tests.conftest import FOLDER_DATA
+
+
+def test_ttl_cache_evicts_least_recently_used_entry():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+
+
+def test_ttl_cache_drops_expired_entry(mocker):
+    monotonic = mocker.patch('app.commons.cache.time.monotonic', return_value=100.0)
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set('a', 1)
+
+    monotonic.return_value = 131.0
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def enable_node_cache(mocker):
+    mocker.patch.object(ConfigClass, 'METADATA_CACHE_TTL', 30)
+
+
+@pytest.mark.asyncio
+async def test_get_node_by_id_serves_node_from_cache(started_http_clients, enable_node_cache, httpx_mock):
+    url = ConfigClass.META_SERVICE + f'item/{FOLDER_DATA["id"]}/'
+    httpx_mock.add_response(method='GET', url=url, json={'result': FOLDER_DATA})
+
+    await get_node_by_id(FOLDER_DATA['id'])
+    node = await get_node_by_id(FOLDER_DATA['id'])
+
+    assert node['id'] == FOLDER_DATA['id']
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_get_by_ids_requests_only_uncached_ids(started_http_clients, enable_node_cache, httpx_mock):
+    cached = FILE_DATA.copy()
+    cached['id'] = str(uuid4())
+    await node_cache.set_many([cached])
+    fetched = FILE_DATA.copy()
+    fetched['id'] = str(uuid4())
+    url = re.compile(f'^{ConfigClass.META_SERVICE}items/batch/.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [fetched]})
+
+    nodes = await bulk_get_by_ids([cached['id'], fetched['id']])
+
+    assert {node['id'] for node in nodes} == {cached['id'], fetched['id']}
+    assert httpx_mock.get_requests()[0].url.params.get_list('ids') == [fetched['id']]
+
+
+@pytest.mark.asyncio
+async def test_bulk_get_by_ids_bypasses_cache_on_request(started_http_clients, enable_node_cache, httpx_mock):
+    node = FILE_DATA.copy()
+    node['id'] = str(uuid4())
+    await node_cache.set_many([node])
+    url = re.compile(f'^{ConfigClass.META_SERVICE}items/batch/.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [node]})
+
+    await bulk_get_by_ids([node['id']], use_cache=False)
+
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_node_cache_close_disconnects_redis(mocker):
+    mocker.patch.object(ConfigClass, 'METADATA_CACHE_REDIS_ENABLED', True)
+    redis = mocker.patch('app.commons.meta_services.cache.StrictRedis.from_url').return_value
+    redis.close = mocker.AsyncMock()
+    redis.connection_pool.disconnect = mocker.AsyncMock()
+    assert node_cache.redis is redis
+
+    await node_cache.close()
+
+    redis.close.assert_awaited_once()
+    redis.connection_pool.disconnect.assert_awaited_once()
+    assert node_cache._redis is None
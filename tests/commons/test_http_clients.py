@@ -0,0 +1,51 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import pytest
+
+from app.commons.http_clients import HTTPClientRegistry
+from app.commons.http_clients import Service
+from app.config import ConfigClass
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_per_service():
+    registry = HTTPClientRegistry()
+    await registry.startup()
+
+    metadata_client = registry.get(Service.METADATA)
+
+    assert registry.get(Service.METADATA) is metadata_client
+    assert registry.get(Service.EMAIL) is not metadata_client
+    await registry.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_registry_shutdown_closes_clients():
+    registry = HTTPClientRegistry()
+    await registry.startup()
+    client = registry.get(Service.AUTH)
+
+    await registry.shutdown()
+
+    assert client.is_closed
+    with pytest.raises(RuntimeError):
+        registry.get(Service.AUTH)
+
+
+@pytest.mark.asyncio
+async def test_registry_applies_per_service_connection_limits(mocker):
+    mocker.patch.object(ConfigClass, 'HTTP_SERVICE_MAX_CONNECTIONS', {'metadata': 7})
+    client_class = mocker.patch('app.commons.http_clients.httpx.AsyncClient')
+    registry = HTTPClientRegistry()
+
+    await registry.startup()
+
+    limits = {
+        service: call.kwargs['limits'] for service, call in zip(Service, client_class.call_args_list, strict=True)
+    }
+    assert limits[Service.METADATA].max_connections == 7
+    assert limits[Service.EMAIL].max_connections == ConfigClass.HTTP_MAX_CONNECTIONS
@@ -0,0 +1,99 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import json
+import re
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.commons.meta_services import bulk_get_by_ids
+from app.commons.meta_services import get_node_by_id
+from app.config import ConfigClass
+from app.models.base import EAPIResponseCode
+from app.resources.error_handler import APIException
+from tests.conftest import FILE_DATA
+from tests.conftest import FOLDER_DATA
+
+
+@pytest.mark.asyncio
+async def test_get_node_by_id_returns_node(started_http_clients, httpx_mock):
+    url = ConfigClass.META_SERVICE + f'item/{FOLDER_DATA["id"]}/'
+    httpx_mock.add_response(method='GET', url=url, json={'result': FOLDER_DATA})
+
+    node = await get_node_by_id(FOLDER_DATA['id'])
+
+    assert node['id'] == FOLDER_DATA['id']
+
+
+@pytest.mark.asyncio
+async def test_get_node_by_id_raises_not_found_for_empty_result(started_http_clients, httpx_mock):
+    url = ConfigClass.META_SERVICE + f'item/{FOLDER_DATA["id"]}/'
+    httpx_mock.add_response(method='GET', url=url, json={'result': {}})
+
+    with pytest.raises(APIException) as exc_info:
+        await get_node_by_id(FOLDER_DATA['id'])
+
+    assert exc_info.value.status_code == EAPIResponseCode.not_found.value
+
+
+class MetadataStandIn:
+    """Local stand-in for metadata service batch endpoint."""
+
+    def __init__(self, items: list[dict]) -> None:
+        self.items = {item['id']: item for item in items}
+        self.requested_batches = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == 'POST':
+            ids = json.loads(request.content)['ids']
+        else:
+            ids = request.url.params.get_list('ids')
+        self.requested_batches.append(ids)
+        return httpx.Response(200, json={'result': [self.items[item_id] for item_id in ids]})
+
+
+@pytest.fixture
+def metadata_stand_in(httpx_mock):
+    items = []
+    for _ in range(5):
+        item = FILE_DATA.copy()
+        item['id'] = str(uuid4())
+        items.append(item)
+    stand_in = MetadataStandIn(items)
+    httpx_mock.add_callback(stand_in, url=re.compile(f'^{ConfigClass.META_SERVICE}items/batch/.*$'))
+    return stand_in
+
+
+@pytest.mark.asyncio
+async def test_bulk_get_by_ids_fetches_ids_in_batches(started_http_clients, mocker, metadata_stand_in):
+    mocker.patch.object(ConfigClass, 'METADATA_BATCH_SIZE', 2)
+    ids = list(metadata_stand_in.items)
+
+    nodes = await bulk_get_by_ids(ids)
+
+    assert [node['id'] for node in nodes] == ids
+    assert sorted(map(len, metadata_stand_in.requested_batches)) == [1, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_bulk_get_by_ids_sends_ids_in_request_body(started_http_clients, mocker, httpx_mock, metadata_stand_in):
+    mocker.patch.object(ConfigClass, 'METADATA_BATCH_SIZE', 3)
+    mocker.patch.object(ConfigClass, 'METADATA_BATCH_TRANSPORT', 'body')
+    ids = list(metadata_stand_in.items)
+
+    nodes = await bulk_get_by_ids(ids)
+
+    assert [node['id'] for node in nodes] == ids
+    assert {request.method for request in httpx_mock.get_requests()} == {'POST'}
+    assert sorted(map(len, metadata_stand_in.requested_batches)) == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_bulk_get_by_ids_skips_request_for_empty_ids(httpx_mock):
+    assert await bulk_get_by_ids([]) == []
+    assert httpx_mock.get_requests() == []
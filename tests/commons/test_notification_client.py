@@ -0,0 +1,39 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from uuid import uuid4
+
+import pytest
+
+from app.commons.notification_service.client import Notification
+from app.commons.notification_service.models import CopyRequestAction
+from tests.conftest import DEST_FOLDER_ID
+from tests.conftest import SRC_FOLDER_ID
+from tests.conftest import TEST_ID_1
+from tests.conftest import TEST_ID_2
+
+
+@pytest.mark.asyncio
+async def test_to_copy_request_notification_fetches_nodes_in_single_request(
+    started_http_clients, httpx_mock, mock_bulk_get_locations
+):
+    notification = Notification(
+        'admin',
+        [TEST_ID_1, TEST_ID_2],
+        'admin',
+        SRC_FOLDER_ID,
+        DEST_FOLDER_ID,
+        'project',
+        CopyRequestAction.APPROVAL,
+        uuid4(),
+    )
+
+    result = await notification.to_copy_request_notification()
+
+    assert len(httpx_mock.get_requests()) == 1
+    assert str(result.source.id) == SRC_FOLDER_ID
+    assert str(result.destination.id) == DEST_FOLDER_ID
+    assert [str(target.id) for target in result.targets] == [TEST_ID_1, TEST_ID_2]
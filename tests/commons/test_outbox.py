@@ -0,0 +1,162 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import asyncio
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+from sqlalchemy import select
+
+from app.commons.database import database
+from app.commons.outbox import OutboxDispatcher
+from app.config import ConfigClass
+from app.models.copy_request_sql import OutboxModel
+
+
+@pytest_asyncio.fixture
+async def dispatcher(db_session):
+    dispatcher = OutboxDispatcher()
+    yield dispatcher
+    await db_session.execute(delete(OutboxModel))
+    await db_session.commit()
+
+
+async def enqueue(session, dispatcher: OutboxDispatcher, kind: str, **payload) -> OutboxModel:
+    message = dispatcher.enqueue(session, kind, **payload)
+    await session.commit()
+    return message
+
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_unknown_kind(db_session, dispatcher):
+    with pytest.raises(ValueError):
+        await enqueue(db_session, dispatcher, 'unknown')
+
+
+@pytest.mark.asyncio
+async def test_dispatch_once_delivers_pending_message(db_session, dispatcher):
+    delivered = []
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        delivered.append(name)
+
+    message = await enqueue(db_session, dispatcher, 'greeting', name='admin')
+
+    assert await dispatcher.dispatch_once() == 1
+    assert delivered == ['admin']
+    await db_session.refresh(message)
+    assert message.status == 'sent'
+    assert message.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_once_reschedules_failed_message_with_backoff(mocker, db_session, dispatcher):
+    mocker.patch.object(ConfigClass, 'OUTBOX_RETRY_BACKOFF', 60.0)
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        raise Exception('Email service is down')
+
+    message = await enqueue(db_session, dispatcher, 'greeting', name='admin')
+
+    await dispatcher.dispatch_once()
+    await db_session.refresh(message)
+    assert message.status == 'pending'
+    assert message.attempts == 1
+    assert message.last_error == 'Email service is down'
+    assert message.next_attempt_at > datetime.utcnow()
+    assert await dispatcher.dispatch_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatch_once_gives_up_after_max_attempts(mocker, db_session, dispatcher):
+    mocker.patch.object(ConfigClass, 'OUTBOX_RETRY_BACKOFF', 0.0)
+    mocker.patch.object(ConfigClass, 'OUTBOX_MAX_ATTEMPTS', 3)
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        raise Exception('Email service is down')
+
+    message = await enqueue(db_session, dispatcher, 'greeting', name='admin')
+
+    await dispatcher.drain()
+    await db_session.refresh(message)
+    assert message.status == 'failed'
+    assert message.attempts == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatch_once_delivers_leased_message_without_holding_connection(db_session, dispatcher):
+    observed = {}
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        observed['checked_out'] = database.pool_status()['checked_out']
+        observed['claimed'] = await dispatcher.claim()
+
+    message = await enqueue(db_session, dispatcher, 'greeting', name='admin')
+
+    assert await dispatcher.dispatch_once() == 1
+    assert observed == {'checked_out': 0, 'claimed': []}
+    await db_session.refresh(message)
+    assert message.status == 'sent'
+
+
+@pytest.mark.asyncio
+async def test_claim_picks_up_message_again_once_lease_expires(mocker, db_session, dispatcher):
+    mocker.patch.object(ConfigClass, 'OUTBOX_LEASE_TIMEOUT', -1.0)
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        pass
+
+    await enqueue(db_session, dispatcher, 'greeting', name='admin')
+
+    assert len(await dispatcher.claim()) == 1
+    messages = await dispatcher.claim()
+    assert len(messages) == 1
+    assert messages[0].attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_sent_messages_older_than_retention(mocker, db_session, dispatcher):
+    mocker.patch.object(ConfigClass, 'OUTBOX_RETENTION', 3600)
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        pass
+
+    old = await enqueue(db_session, dispatcher, 'greeting', name='old')
+    recent = await enqueue(db_session, dispatcher, 'greeting', name='recent')
+    pending = await enqueue(db_session, dispatcher, 'greeting', name='pending')
+    for message, sent_at in [(old, datetime.utcnow() - timedelta(hours=2)), (recent, datetime.utcnow())]:
+        message.status = 'sent'
+        message.sent_at = sent_at
+    await db_session.commit()
+
+    assert await dispatcher.purge() == 1
+    remaining = (await db_session.execute(select(OutboxModel.id))).scalars().all()
+    assert sorted(remaining) == sorted([recent.id, pending.id])
+
+
+@pytest.mark.asyncio
+async def test_background_task_delivers_message_on_wake(mocker, db_session, dispatcher):
+    mocker.patch.object(ConfigClass, 'OUTBOX_POLL_INTERVAL', 60.0)
+    delivered = asyncio.Event()
+
+    @dispatcher.handler('greeting')
+    async def greet(name: str):
+        delivered.set()
+
+    await dispatcher.startup()
+    await enqueue(db_session, dispatcher, 'greeting', name='admin')
+    dispatcher.wake()
+    await asyncio.wait_for(delivered.wait(), 5)
+    await dispatcher.shutdown()
@@ -0,0 +1,23 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import pytest
+
+from app.commons.project_services import query_project
+from app.config import ConfigClass
+from tests.conftest import TestProject
+
+
+@pytest.mark.asyncio
+async def test_query_project_serves_project_from_local_cache(mocker):
+    mocker.patch.object(ConfigClass, 'PROJECT_CACHE_TTL', 300)
+    get_project = mocker.patch('common.project.project_client.ProjectClient.get', return_value=TestProject)
+
+    await query_project(TestProject.code)
+    project = await query_project(TestProject.code)
+
+    assert project.name == TestProject.name
+    get_project.assert_called_once_with(code=TestProject.code)
@@ -0,0 +1,59 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy import select
+
+from app.commons.psql_services import MAX_BIND_PARAMETERS
+from app.commons.psql_services import build_entity_paths
+from app.commons.psql_services import insert_entities_from_nodes
+from app.models.copy_request_sql import EntityModel
+from app.models.copy_request_sql import RequestModel
+from tests.conftest import FILE_DATA
+
+
+def test_build_entity_paths_resolves_unordered_hierarchy():
+    entities = [
+        {'id': 'file', 'parent': 'sub_folder'},
+        {'id': 'sub_folder', 'parent': 'folder'},
+        {'id': 'folder', 'parent': None},
+        {'id': 'orphan', 'parent': 'unknown'},
+    ]
+
+    paths = build_entity_paths(entities)
+
+    assert paths == {
+        'file': 'folder/sub_folder/file',
+        'sub_folder': 'folder/sub_folder',
+        'folder': 'folder',
+        'orphan': 'orphan',
+    }
+
+
+def test_build_entity_paths_extends_known_paths():
+    known_paths = {'folder': 'folder'}
+
+    paths = build_entity_paths([{'id': 'file', 'parent': 'folder'}], known_paths)
+
+    assert paths is known_paths
+    assert paths['file'] == 'folder/file'
+
+
+@pytest.mark.asyncio
+async def test_insert_entities_from_nodes_caps_batch_to_bind_parameters_limit(db_session):
+    request_obj = RequestModel(status='pending', submitted_by='admin', project_code='insert_fake_project')
+    db_session.add(request_obj)
+    await db_session.flush()
+    entities = [{**FILE_DATA, 'id': str(uuid4())} for _ in range(MAX_BIND_PARAMETERS // 10)]
+
+    inserted = await insert_entities_from_nodes(db_session, request_obj.id, entities, batch_size=len(entities))
+
+    query = select(func.count()).where(EntityModel.request_id == request_obj.id)
+    assert inserted == (await db_session.execute(query)).scalar() == len(entities)
+    await db_session.rollback()
@@ -7,7 +7,9 @@
 import re
 from uuid import uuid4
 
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from pytest_httpx import HTTPXMock
 from sqlalchemy import create_engine
@@ -18,11 +20,20 @@ from sqlalchemy_utils import create_database
 from sqlalchemy_utils import database_exists
 from testcontainers.postgres import PostgresContainer
 
+from app.commons.auth_services import project_admins_cache
+from app.commons.auth_services import user_cache
+from app.commons.database import database
+from app.commons.http_clients import http_clients
+from app.commons.meta_services.cache import node_cache
 from app.commons.meta_services.models import MetadataItemStatus
+from app.commons.project_services import project_cache
+from app.commons.psql_services import routing_cache
+from app.commons.psql_services import routing_generations
 from app.config import ConfigClass
 from app.main import create_app
 from app.models.copy_request_sql import Base
 from app.models.copy_request_sql import EntityModel
+from app.models.copy_request_sql import OutboxModel
 from app.models.copy_request_sql import RequestModel
 
 DEST_FOLDER_ID = str(uuid4())
@@ -140,40 +151,23 @@ def mock_dest(httpx_mock):
 
 
 @pytest.fixture
-def mock_bulk_get_src(httpx_mock):
-    get_by_geid_url = ConfigClass.META_SERVICE + 'items/batch/'
-    mock_folder = FOLDER_DATA.copy()
-    mock_folder['id'] = str(SRC_FOLDER_ID)
-    mock_folder['name'] = 'src_folder'
-    mock_data = {'result': [mock_folder]}
-    httpx_mock.add_response(
-        method='GET', url=f'{get_by_geid_url}?ids={str(SRC_FOLDER_ID)}', json=mock_data, status_code=200
-    )
+def mock_bulk_get_locations(httpx_mock):
+    """Mock combined notification lookup of source and destination folders together with target files."""
 
+    def callback(request: httpx.Request) -> httpx.Response:
+        nodes = []
+        for entity_id in request.url.params.get_list('ids'):
+            if entity_id in (SRC_FOLDER_ID, DEST_FOLDER_ID):
+                node = FOLDER_DATA.copy()
+                node['name'] = 'src_folder' if entity_id == SRC_FOLDER_ID else 'dest_folder'
+            else:
+                node = FILE_DATA.copy()
+            node['id'] = entity_id
+            nodes.append(node)
+        return httpx.Response(200, json={'result': nodes})
 
-@pytest.fixture
-def mock_bulk_get_dest(httpx_mock):
-    get_by_geid_url = ConfigClass.META_SERVICE + 'items/batch/'
-    mock_folder = FOLDER_DATA.copy()
-    mock_folder['id'] = str(DEST_FOLDER_ID)
-    mock_folder['name'] = 'dest_folder'
-    mock_data = {'result': [mock_folder]}
-    httpx_mock.add_response(
-        method='GET', url=f'{get_by_geid_url}?ids={str(DEST_FOLDER_ID)}', json=mock_data, status_code=200
-    )
-
-
-@pytest.fixture
-def mock_bulk_get_id(httpx_mock):
-    mock_file = FILE_DATA.copy()
-    mock_file['id'] = str(TEST_ID_1)
-    mock_file['name'] = 'TEST_ID_1'
-    mock_file2 = FILE_DATA.copy()
-    mock_file2['id'] = str(TEST_ID_2)
-    mock_file2['name'] = 'TEST_ID_2'
-    mock_data = {'result': [mock_file, mock_file2]}
-    url = re.compile(f'^{ConfigClass.META_SERVICE}items/batch.*$')
-    httpx_mock.add_response(method='GET', url=url, json=mock_data, status_code=200)
+    url = re.compile(f'^{ConfigClass.META_SERVICE}items/batch/\\?ids={SRC_FOLDER_ID}&ids={DEST_FOLDER_ID}(&.*)?$')
+    httpx_mock.add_callback(callback, method='GET', url=url)
 
 
 @pytest.fixture
@@ -219,16 +213,53 @@ def db():
         CreateTable(EntityModel.__table__).compile(dialect=postgresql.dialect())
         if not engine.dialect.has_schema(engine, ConfigClass.RDS_SCHEMA_DEFAULT):
             engine.execute(CreateSchema(ConfigClass.RDS_SCHEMA_DEFAULT))
+        engine.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
         Base.metadata.create_all(bind=engine)
+        ConfigClass.DB_URI = postgres_uri
         yield postgres
 
 
 @pytest.fixture
-def test_client(db):
-    ConfigClass.DB_URI = db.get_connection_url()
+def test_client(db, httpx_mock):
     app = create_app()
-    client = TestClient(app)
-    return client
+    # outbox is drained on shutdown, so messages enqueued by the test are delivered before mocked responses are checked
+    with TestClient(app) as client:
+        yield client
+    engine = create_engine(db.get_connection_url())
+    undelivered = engine.execute(OutboxModel.__table__.select().where(OutboxModel.status != 'sent')).all()
+    engine.execute(OutboxModel.__table__.delete())
+    engine.dispose()
+    assert undelivered == []
+
+
+@pytest_asyncio.fixture
+async def db_session(db):
+    await database.startup()
+    async with database.session() as session:
+        yield session
+    await database.shutdown()
+
+
+@pytest_asyncio.fixture
+async def started_http_clients():
+    await http_clients.startup()
+    yield http_clients
+    await http_clients.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def disable_caches(mocker):
+    mocker.patch.object(ConfigClass, 'METADATA_CACHE_TTL', 0)
+    mocker.patch.object(ConfigClass, 'AUTH_CACHE_TTL', 0)
+    mocker.patch.object(ConfigClass, 'AUTH_CACHE_NEGATIVE_TTL', 0)
+    mocker.patch.object(ConfigClass, 'PROJECT_CACHE_TTL', 0)
+    mocker.patch.object(ConfigClass, 'ROUTING_CACHE_TTL', 0)
+    caches = [node_cache, user_cache, project_admins_cache, project_cache, routing_cache, routing_generations]
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
 
 
 @pytest.fixture
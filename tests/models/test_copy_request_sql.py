@@ -0,0 +1,51 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from datetime import datetime
+from uuid import uuid4
+
+from app.models.copy_request_sql import EntityModel
+from app.models.copy_request_sql import RequestModel
+
+
+def test_request_to_dict_formats_ids_and_timestamps():
+    request_id = uuid4()
+    request_obj = RequestModel(
+        id=request_id,
+        status='pending',
+        submitted_at=datetime(2022, 1, 2, 3, 4, 5, 678901),
+        source_id=uuid4(),
+        project_code='project',
+    )
+
+    result = request_obj.to_dict()
+
+    assert list(result) == RequestModel.__table__.columns.keys()
+    assert result['id'] == str(request_id)
+    assert result['submitted_at'] == '2022-01-02T03:04:05.678Z'
+    assert result['completed_at'] is None
+    assert result['destination_id'] == 'None'
+    assert result['project_code'] == 'project'
+
+
+def test_entity_to_dict_formats_ids_and_timestamps():
+    entity_id = uuid4()
+    entity = EntityModel(
+        id=uuid4(),
+        request_id=uuid4(),
+        entity_id=entity_id,
+        entity_type='file',
+        uploaded_at=datetime(2022, 1, 2, 3, 4, 5, 678901),
+        file_size=10,
+    )
+
+    result = entity.to_dict()
+
+    assert list(result) == EntityModel.__table__.columns.keys()
+    assert result['entity_id'] == str(entity_id)
+    assert result['parent_id'] == 'None'
+    assert result['uploaded_at'] == '2022-01-02T03:04:05.678Z'
+    assert result['file_size'] == 10
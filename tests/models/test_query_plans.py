@@ -0,0 +1,179 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import hashlib
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import UUID
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import func
+from sqlalchemy import select
+
+from app.commons.psql_services import sub_file_ids_query
+from app.commons.psql_services.pagination import encode_cursor
+from app.commons.psql_services.pagination import paginate_with_total
+from app.models.copy_request_sql import EntityModel
+from app.models.copy_request_sql import RequestModel
+from app.routers.v1.api_copy_request.api_copy_request import REQUEST_SORT_KEYS
+
+REQUEST_ID = str(uuid4())
+PROJECT_CODE_PREFIX = 'plan_project_'
+FOLDER_ID = str(UUID(hashlib.md5(b'7').hexdigest()))
+
+
+def seed(connection) -> None:
+    """Populate tables with representative distribution so planner picks indexes by its own estimates.
+
+    Entities are spread over many requests, one of which is the request filtered by tested statements. Files of the
+    request are placed into its top level folders by materialized path.
+    """
+
+    request_table = RequestModel.__table__.fullname
+    entity_table = EntityModel.__table__.fullname
+    connection.exec_driver_sql(
+        f"""
+        INSERT INTO {request_table} (id, status, submitted_by, submitted_at, project_code)
+        SELECT md5(i::text)::uuid,
+               (ARRAY['pending', 'complete'])[1 + mod(i, 2)],
+               'user_' || mod(i, 50),
+               now() - i * interval '1 minute',
+               '{PROJECT_CODE_PREFIX}' || mod(i, 20)
+        FROM generate_series(1, 5000) AS i
+        """
+    )
+    connection.exec_driver_sql(
+        f"""
+        INSERT INTO {request_table} (id, status, project_code)
+        VALUES ('{REQUEST_ID}', 'pending', '{PROJECT_CODE_PREFIX}request')
+        """
+    )
+    connection.exec_driver_sql(
+        f"""
+        INSERT INTO {entity_table} (
+            id, request_id, entity_id, entity_type, review_status, parent_id, path, name, uploaded_by
+        )
+        SELECT md5(random()::text)::uuid,
+               CASE WHEN mod(i, 50) = 0 THEN '{REQUEST_ID}'::uuid ELSE md5(mod(i, 5000)::text)::uuid END,
+               md5(random()::text)::uuid,
+               'file',
+               (ARRAY['pending', 'approved', 'denied'])[1 + mod(i, 3)],
+               md5(mod(i, 100)::text)::uuid,
+               md5(mod(i, 100)::text) || '/' || i,
+               'file_' || md5(i::text) || '.txt',
+               'user_' || mod(i, 5000)
+        FROM generate_series(1, 200000) AS i
+        """
+    )
+    connection.exec_driver_sql(
+        f"""
+        INSERT INTO {entity_table} (id, request_id, entity_id, entity_type, review_status, path, name, uploaded_by)
+        SELECT md5(random()::text)::uuid,
+               '{REQUEST_ID}'::uuid,
+               md5(i::text)::uuid,
+               'folder',
+               'pending',
+               md5(i::text),
+               'folder_' || i,
+               'user_' || i
+        FROM generate_series(0, 99) AS i
+        """
+    )
+    connection.exec_driver_sql(f'VACUUM ANALYZE {request_table}')
+    connection.exec_driver_sql(f'VACUUM ANALYZE {entity_table}')
+
+
+@pytest.fixture(scope='module')
+def connection(db):
+    engine = create_engine(db.get_connection_url(), isolation_level='AUTOCOMMIT')
+    with engine.connect() as connection:
+        seed(connection)
+        yield connection
+        # entities are removed by ON DELETE CASCADE of approval_entity.request_id
+        connection.execute(
+            RequestModel.__table__.delete().where(RequestModel.project_code.startswith(PROJECT_CODE_PREFIX))
+        )
+    engine.dispose()
+
+
+def explain(connection, statement) -> str:
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    rows = connection.exec_driver_sql(f'EXPLAIN {compiled}', compiled.params)
+    return '\n'.join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    'statement,index_name',
+    [
+        (
+            select(EntityModel).where(EntityModel.request_id == REQUEST_ID, EntityModel.parent_id == str(uuid4())),
+            'ix_approval_entity_request_id_parent_id',
+        ),
+        (
+            select(EntityModel).where(EntityModel.request_id == REQUEST_ID, EntityModel.parent_id.is_(None)),
+            'ix_approval_entity_request_id_parent_id',
+        ),
+        (
+            select(func.count()).where(EntityModel.request_id == REQUEST_ID, EntityModel.review_status == 'pending'),
+            'ix_approval_entity_request_id_review_status',
+        ),
+        (
+            select(EntityModel).where(EntityModel.request_id == REQUEST_ID, EntityModel.entity_id == str(uuid4())),
+            'ix_approval_entity_request_id_entity_id',
+        ),
+        (
+            select(EntityModel).where(EntityModel.request_id == REQUEST_ID, EntityModel.name.contains('c4ca4238')),
+            'ix_approval_entity_name_trgm',
+        ),
+        (
+            select(EntityModel).where(
+                EntityModel.request_id == REQUEST_ID, EntityModel.uploaded_by.contains('user_4242')
+            ),
+            'ix_approval_entity_uploaded_by_trgm',
+        ),
+        (
+            sub_file_ids_query(REQUEST_ID, [FOLDER_ID], 'pending'),
+            'ix_approval_entity_request_id_path',
+        ),
+        (
+            paginate_with_total(
+                select(RequestModel).filter_by(status='complete', project_code=f'{PROJECT_CODE_PREFIX}1'),
+                REQUEST_SORT_KEYS,
+                0,
+                25,
+            ),
+            'ix_approval_request_project_code_status',
+        ),
+        (
+            paginate_with_total(
+                select(RequestModel).filter_by(status='complete', project_code=f'{PROJECT_CODE_PREFIX}1'),
+                REQUEST_SORT_KEYS,
+                0,
+                25,
+                encode_cursor(REQUEST_SORT_KEYS, SimpleNamespace(submitted_at=datetime.utcnow(), id=uuid4())),
+            ),
+            'ix_approval_request_project_code_status',
+        ),
+        (
+            paginate_with_total(
+                select(RequestModel).filter_by(
+                    status='complete', project_code=f'{PROJECT_CODE_PREFIX}1', submitted_by='user_1'
+                ),
+                REQUEST_SORT_KEYS,
+                0,
+                25,
+            ),
+            'ix_approval_request_project_code_status_submitted_by',
+        ),
+    ],
+)
+def test_hot_queries_use_composite_indexes(connection, statement, index_name):
+    plan = explain(connection, statement)
+
+    assert 'Seq Scan' not in plan
+    assert index_name in plan
@@ -4,13 +4,25 @@
 # Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
 # You may not use this file except in compliance with the License.
 
+import csv
+import io
+import json
 import re
+from datetime import datetime
 from uuid import uuid4
 
+import httpx
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 
+from app.commons.database import database
 from app.commons.meta_services.models import MetadataItemStatus
+from app.commons.psql_services import routing_cache
+from app.commons.psql_services.export import EXPORTERS
 from app.config import ConfigClass
+from app.models.copy_request_sql import EntityModel
+from app.models.copy_request_sql import RequestModel
 from tests.conftest import DEST_FOLDER_ID
 from tests.conftest import FILE_DATA
 from tests.conftest import FOLDER_DATA
@@ -109,9 +121,7 @@ def test_approve_partial_files_200(
     test_client,
     httpx_mock,
     mock_project,
-    mock_bulk_get_src,
-    mock_bulk_get_dest,
-    mock_bulk_get_id,
+    mock_bulk_get_locations,
     mock_notification_send,
 ):
     payload = {'status': 'pending'}
@@ -258,8 +268,7 @@ def test_partial_approved_200(
     mock_user,
     mock_project,
     mock_roles,
-    mock_bulk_get_src,
-    mock_bulk_get_dest,
+    mock_bulk_get_locations,
     mock_notification_send,
 ):
     FILE_DATA_2 = FILE_DATA.copy()
@@ -416,6 +425,48 @@ def test_pending_files_list_handle_archived_200(test_client, httpx_mock, create_
     assert response.json()['result']['pending_count'] == 0
 
 
+def mock_pending_metadata(httpx_mock, checked_out: list[int]) -> None:
+    def get_items(request: httpx.Request) -> httpx.Response:
+        checked_out.append(database.pool_status()['checked_out'])
+        items = [{**FILE_DATA, 'id': entity_id} for entity_id in request.url.params.get_list('ids')]
+        return httpx.Response(status_code=200, json={'result': items})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_callback(get_items, method='GET', url=url)
+
+
+def test_pending_files_list_releases_connection_during_metadata_lookup_200(test_client, db, httpx_mock):
+    request_id, entity_ids = create_entity_chain(db, 'pending_fake_project', 2)
+    checked_out = []
+    mock_pending_metadata(httpx_mock, checked_out)
+
+    payload = {'request_id': request_id}
+    response = test_client.get('/v1/request/copy/pending_fake_project/pending-files', params=payload)
+
+    assert response.status_code == 200
+    assert sorted(response.json()['result']['pending_entities']) == sorted(entity_ids)
+    assert checked_out == [0]
+
+
+def test_complete_request_releases_connection_during_metadata_lookup_400(test_client, db, httpx_mock):
+    request_id, entity_ids = create_entity_chain(db, 'pending_fake_project', 2)
+    checked_out = []
+    mock_pending_metadata(httpx_mock, checked_out)
+
+    payload = {
+        'request_id': request_id,
+        'session_id': 'admin-123',
+        'status': 'complete',
+        'review_notes': 'done',
+        'username': 'admin',
+    }
+    response = test_client.put('/v1/request/copy/pending_fake_project', json=payload)
+
+    assert response.status_code == 400
+    assert response.json()['result']['pending_count'] == len(entity_ids)
+    assert checked_out == [0]
+
+
 def test_update_copy_status_200(test_client, httpx_mock):
     payload = {'status': 'pending'}
     response = test_client.get('/v1/request/copy/approval_fake_project', params=payload)
@@ -435,3 +486,529 @@ def test_update_copy_status_400(test_client, httpx_mock):
     payload = {'entities': ['not_exist'], 'copy_status': 'copied'}
     response = test_client.put(f'/v1/request/{request_id}/copy-status', json=payload)
     assert response.status_code == 400
+
+
+def test_create_request_inserts_entities_in_batches_200(
+    test_client, httpx_mock, mocker, mock_project, mock_src, mock_dest, mock_user, mock_roles
+):
+    mocker.patch.object(ConfigClass, 'ENTITY_INSERT_BATCH_SIZE', 2)
+    folder_data = FOLDER_DATA.copy()
+    folder_data['id'] = str(uuid4())
+    files_data = []
+    for i in range(5):
+        file_data = FILE_DATA.copy()
+        file_data['id'] = str(uuid4())
+        file_data['name'] = f'batch_file_{i}'
+        file_data['parent'] = folder_data['id']
+        files_data.append(file_data)
+
+    # mock notification
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [folder_data]}, status_code=200)
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/search.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': files_data}, status_code=200)
+
+    payload = {
+        'entity_ids': [folder_data['id']],
+        'destination_id': DEST_FOLDER_ID,
+        'source_id': SRC_FOLDER_ID,
+        'note': 'testing',
+        'submitted_by': 'admin',
+    }
+    response = test_client.post('/v1/request/copy/batch_fake_project', json=payload)
+    assert response.status_code == 200
+    request_id = response.json()['result']['id']
+
+    payload = {'request_id': request_id, 'parent_id': folder_data['id']}
+    response = test_client.get('/v1/request/copy/batch_fake_project/files', params=payload)
+    assert response.status_code == 200
+    assert response.json()['total'] == 5
+
+
+def test_review_nested_folder_updates_all_sub_files_200(
+    test_client,
+    httpx_mock,
+    mock_project,
+    mock_src,
+    mock_dest,
+    mock_user,
+    mock_roles,
+    mock_bulk_get_locations,
+    mock_notification_send,
+):
+    folder_data = FOLDER_DATA.copy()
+    folder_data['id'] = str(uuid4())
+    sub_folder_data = FOLDER_DATA.copy()
+    sub_folder_data['id'] = str(uuid4())
+    sub_folder_data['parent'] = folder_data['id']
+    sub_files_data = []
+    for parent_id in [folder_data['id'], sub_folder_data['id'], sub_folder_data['id']]:
+        file_data = FILE_DATA.copy()
+        file_data['id'] = str(uuid4())
+        file_data['parent'] = parent_id
+        sub_files_data.append(file_data)
+
+    # mock notification
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [folder_data]}, status_code=200)
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/search.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [sub_folder_data, *sub_files_data]}, status_code=200)
+
+    payload = {
+        'entity_ids': [folder_data['id']],
+        'destination_id': DEST_FOLDER_ID,
+        'source_id': SRC_FOLDER_ID,
+        'note': 'testing',
+        'submitted_by': 'admin',
+    }
+    response = test_client.post('/v1/request/copy/tree_fake_project', json=payload)
+    assert response.status_code == 200
+    request_id = response.json()['result']['id']
+
+    payload = {
+        'entity_ids': [folder_data['id']],
+        'request_id': request_id,
+        'review_status': 'denied',
+        'username': 'admin',
+        'session_id': 'admin-123',
+    }
+    response = test_client.patch('/v1/request/copy/tree_fake_project/files', json=payload)
+    assert response.status_code == 200
+    assert response.json()['result']['updated'] == 3
+    assert response.json()['result']['approved'] == 0
+    assert response.json()['result']['denied'] == 0
+
+
+def test_approve_nested_file_triggers_pipeline_with_ancestors_200(
+    test_client,
+    httpx_mock,
+    mock_project,
+    mock_src,
+    mock_dest,
+    mock_user,
+    mock_roles,
+    mock_bulk_get_locations,
+    mock_notification_send,
+):
+    folder_data = FOLDER_DATA.copy()
+    folder_data['id'] = str(uuid4())
+    sub_folder_data = FOLDER_DATA.copy()
+    sub_folder_data['id'] = str(uuid4())
+    sub_folder_data['parent'] = folder_data['id']
+    file_data = FILE_DATA.copy()
+    file_data['id'] = str(uuid4())
+    file_data['parent'] = sub_folder_data['id']
+
+    # mock notification
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [folder_data]}, status_code=200)
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/search.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [sub_folder_data, file_data]}, status_code=200)
+
+    # mock trigger pipeline
+    pipeline_url = ConfigClass.DATA_UTILITY_SERVICE + 'files/actions/'
+    httpx_mock.add_response(method='POST', url=pipeline_url, json={'operation_info': ''})
+
+    payload = {
+        'entity_ids': [folder_data['id']],
+        'destination_id': DEST_FOLDER_ID,
+        'source_id': SRC_FOLDER_ID,
+        'note': 'testing',
+        'submitted_by': 'admin',
+    }
+    response = test_client.post('/v1/request/copy/ancestors_fake_project', json=payload)
+    assert response.status_code == 200
+    request_id = response.json()['result']['id']
+
+    payload = {
+        'entity_ids': [file_data['id']],
+        'request_id': request_id,
+        'review_status': 'approved',
+        'username': 'admin',
+        'session_id': 'admin-123',
+    }
+    headers = {'Authorization': 'fake'}
+    response = test_client.patch('/v1/request/copy/ancestors_fake_project/files', json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()['result']['updated'] == 1
+
+    request_info = json.loads(httpx_mock.get_request(url=pipeline_url).content)['payload']['request_info']
+    assert set(request_info[request_id]) == {folder_data['id'], sub_folder_data['id'], file_data['id']}
+
+
+def create_requests(db, project_code: str, count: int) -> None:
+    engine = create_engine(db.get_connection_url())
+    with Session(engine) as session:
+        for i in range(count):
+            session.add(
+                RequestModel(
+                    status='pending',
+                    submitted_by='admin',
+                    project_code=project_code,
+                    submitted_at=datetime(2022, 1, 1, i),
+                )
+            )
+        session.commit()
+    engine.dispose()
+
+
+def test_list_requests_cursor_pagination_200(test_client, db):
+    create_requests(db, 'cursor_fake_project', 5)
+
+    payload = {'status': 'pending', 'page_size': 2}
+    pages = []
+    while True:
+        response = test_client.get('/v1/request/copy/cursor_fake_project', params=payload)
+        assert response.status_code == 200
+        assert response.json()['total'] == 5
+        pages.append([request['submitted_at'] for request in response.json()['result']])
+        if not response.json()['next_cursor']:
+            break
+        payload['cursor'] = response.json()['next_cursor']
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    submitted_at = [value for page in pages for value in page]
+    assert submitted_at == sorted(submitted_at, reverse=True)
+
+
+def test_list_request_files_cursor_matches_offset_pagination_200(
+    test_client, httpx_mock, mock_project, mock_src, mock_dest, mock_user, mock_roles
+):
+    folder_data = FOLDER_DATA.copy()
+    folder_data['id'] = str(uuid4())
+    files_data = []
+    for i in range(5):
+        file_data = FILE_DATA.copy()
+        file_data['id'] = str(uuid4())
+        file_data['name'] = f'cursor_file_{i % 3}'
+        file_data['parent'] = folder_data['id']
+        files_data.append(file_data)
+
+    # mock notification
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': [folder_data]}, status_code=200)
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/search.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': files_data}, status_code=200)
+
+    payload = {
+        'entity_ids': [folder_data['id']],
+        'destination_id': DEST_FOLDER_ID,
+        'source_id': SRC_FOLDER_ID,
+        'note': 'testing',
+        'submitted_by': 'admin',
+    }
+    response = test_client.post('/v1/request/copy/cursor_fake_project', json=payload)
+    assert response.status_code == 200
+    request_id = response.json()['result']['id']
+
+    payload = {
+        'request_id': request_id,
+        'parent_id': folder_data['id'],
+        'order_by': 'name',
+        'order_type': 'desc',
+        'page_size': 2,
+    }
+    offset_ids = []
+    for page in range(3):
+        response = test_client.get('/v1/request/copy/cursor_fake_project/files', params={**payload, 'page': page})
+        offset_ids += [entity['id'] for entity in response.json()['result']['data']]
+
+    cursor_ids = []
+    while True:
+        response = test_client.get('/v1/request/copy/cursor_fake_project/files', params=payload)
+        assert response.status_code == 200
+        cursor_ids += [entity['id'] for entity in response.json()['result']['data']]
+        if not response.json()['next_cursor']:
+            break
+        payload['cursor'] = response.json()['next_cursor']
+
+    assert len(cursor_ids) == 5
+    assert cursor_ids == offset_ids
+
+
+def test_list_request_files_invalid_cursor_400(test_client):
+    payload = {'request_id': str(uuid4()), 'cursor': 'not-a-cursor'}
+    response = test_client.get('/v1/request/copy/cursor_fake_project/files', params=payload)
+    assert response.status_code == 400
+
+
+def test_list_requests_total_past_last_page_200(test_client, db):
+    create_requests(db, 'total_fake_project', 3)
+
+    payload = {'status': 'pending', 'page_size': 2, 'page': 5}
+    response = test_client.get('/v1/request/copy/total_fake_project', params=payload)
+    assert response.status_code == 200
+    assert response.json()['result'] == []
+    assert response.json()['total'] == 3
+    assert response.json()['num_of_pages'] == 2
+
+
+def test_list_requests_approximate_total_200(test_client, db):
+    create_requests(db, 'estimate_fake_project', 3)
+
+    payload = {'status': 'pending', 'approximate_total': True}
+    response = test_client.get('/v1/request/copy/estimate_fake_project', params=payload)
+    assert response.status_code == 200
+    assert len(response.json()['result']) == 3
+    assert isinstance(response.json()['total'], int)
+
+
+def test_create_request_expands_multiple_folders_200(
+    test_client, httpx_mock, mocker, mock_project, mock_src, mock_dest, mock_user, mock_roles
+):
+    mocker.patch.object(ConfigClass, 'FOLDER_EXPANSION_CONCURRENCY', 2)
+    folders_data = []
+    folder_files = {}
+    for i in range(3):
+        folder_data = FOLDER_DATA.copy()
+        folder_data['id'] = str(uuid4())
+        folder_data['name'] = f'expand_folder_{i}'
+        folders_data.append(folder_data)
+        file_data = FILE_DATA.copy()
+        file_data['id'] = str(uuid4())
+        file_data['parent'] = folder_data['id']
+        folder_files[f'{folder_data["parent_path"]}/{folder_data["name"]}'] = [file_data]
+
+    def search_callback(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={'result': folder_files[request.url.params['parent_path']]})
+
+    # mock notification
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/batch.*$')
+    httpx_mock.add_response(method='GET', url=url, json={'result': folders_data}, status_code=200)
+    url = re.compile('^' + ConfigClass.META_SERVICE + 'items/search.*$')
+    httpx_mock.add_callback(search_callback, method='GET', url=url)
+
+    payload = {
+        'entity_ids': [folder_data['id'] for folder_data in folders_data],
+        'destination_id': DEST_FOLDER_ID,
+        'source_id': SRC_FOLDER_ID,
+        'note': 'testing',
+        'submitted_by': 'admin',
+    }
+    response = test_client.post('/v1/request/copy/expand_fake_project', json=payload)
+    assert response.status_code == 200
+    request_id = response.json()['result']['id']
+
+    assert len(httpx_mock.get_requests(url=url)) == 3
+    for folder_data in folders_data:
+        payload = {'request_id': request_id, 'parent_id': folder_data['id']}
+        response = test_client.get('/v1/request/copy/expand_fake_project/files', params=payload)
+        assert response.json()['total'] == 1
+        assert response.json()['result']['routing'][0]['path'] == folder_data['id']
+
+
+def create_entity_chain(db, project_code: str, depth: int) -> tuple[str, list[str]]:
+    engine = create_engine(db.get_connection_url())
+    with Session(engine) as session:
+        request_obj = RequestModel(status='pending', submitted_by='admin', project_code=project_code)
+        session.add(request_obj)
+        session.flush()
+        entity_ids = []
+        parent_id = None
+        for _ in range(depth):
+            entity_id = str(uuid4())
+            entity_ids.append(entity_id)
+            session.add(
+                EntityModel(
+                    request_id=request_obj.id,
+                    entity_id=entity_id,
+                    entity_type='folder',
+                    review_status='pending',
+                    parent_id=parent_id,
+                    path='/'.join(entity_ids),
+                )
+            )
+            parent_id = entity_id
+        session.commit()
+        request_id = str(request_obj.id)
+    engine.dispose()
+    return request_id, entity_ids
+
+
+def test_list_request_files_routing_resolves_all_ancestors_200(test_client, db):
+    request_id, entity_ids = create_entity_chain(db, 'routing_fake_project', 4)
+
+    payload = {'request_id': request_id, 'parent_id': entity_ids[2]}
+    response = test_client.get('/v1/request/copy/routing_fake_project/files', params=payload)
+
+    assert response.status_code == 200
+    assert [item['entity_id'] for item in response.json()['result']['routing']] == entity_ids[2::-1]
+    assert [item['entity_id'] for item in response.json()['result']['data']] == [entity_ids[3]]
+
+
+def test_list_request_files_routing_cached_until_entities_change_200(test_client, db, mocker):
+    mocker.patch.object(ConfigClass, 'ROUTING_CACHE_TTL', 60)
+    request_id, entity_ids = create_entity_chain(db, 'routing_fake_project', 2)
+    payload = {'request_id': request_id, 'parent_id': entity_ids[1]}
+    response = test_client.get('/v1/request/copy/routing_fake_project/files', params=payload)
+    assert response.json()['result']['routing'][0]['review_status'] == 'pending'
+
+    engine = create_engine(db.get_connection_url())
+    with Session(engine) as session:
+        session.query(EntityModel).filter_by(request_id=request_id).update({'review_status': 'approved'})
+        session.commit()
+    engine.dispose()
+
+    response = test_client.get('/v1/request/copy/routing_fake_project/files', params=payload)
+    assert response.json()['result']['routing'][0]['review_status'] == 'pending'
+
+    response = test_client.put(
+        f'/v1/request/{request_id}/copy-status', json={'entities': [entity_ids[1]], 'copy_status': 'copied'}
+    )
+    assert response.status_code == 200
+
+    response = test_client.get('/v1/request/copy/routing_fake_project/files', params=payload)
+    assert response.json()['result']['routing'][0]['review_status'] == 'approved'
+    assert response.json()['result']['routing'][0]['copy_status'] == 'copied'
+
+
+def test_list_request_files_routing_cache_bounded_per_breadcrumb_200(test_client, db, mocker):
+    mocker.patch.object(ConfigClass, 'ROUTING_CACHE_TTL', 60)
+    mocker.patch.object(routing_cache, 'maxsize', 2)
+    request_id, entity_ids = create_entity_chain(db, 'routing_fake_project', 4)
+
+    for depth in range(3):
+        payload = {'request_id': request_id, 'parent_id': entity_ids[depth]}
+        response = test_client.get('/v1/request/copy/routing_fake_project/files', params=payload)
+        assert [item['entity_id'] for item in response.json()['result']['routing']] == entity_ids[depth::-1]
+
+    assert len(routing_cache) == 2
+
+
+def test_delete_request_removes_request_and_entities_200(test_client, db):
+    engine = create_engine(db.get_connection_url())
+    with Session(engine) as session:
+        request_obj = RequestModel(status='pending', submitted_by='admin', project_code='delete_fake_project')
+        session.add(request_obj)
+        session.flush()
+        for _ in range(3):
+            session.add(EntityModel(request_id=request_obj.id, entity_id=uuid4(), entity_type='file'))
+        session.commit()
+        request_id = request_obj.id
+
+    response = test_client.delete(f'/v1/request/copy/delete_fake_project/delete/{request_id}')
+    assert response.status_code == 200
+
+    with Session(engine) as session:
+        assert session.query(RequestModel).filter_by(id=request_id).count() == 0
+        assert session.query(EntityModel).filter_by(request_id=request_id).count() == 0
+    engine.dispose()
+
+
+def test_delete_request_returns_not_found_for_unknown_request_404(test_client):
+    response = test_client.delete(f'/v1/request/copy/delete_fake_project/delete/{uuid4()}')
+    assert response.status_code == 404
+
+
+def test_get_summary_counts_files_and_sizes_per_status_200(test_client, db):
+    engine = create_engine(db.get_connection_url())
+    with Session(engine) as session:
+        request_obj = RequestModel(status='pending', submitted_by='admin', project_code='summary_fake_project')
+        session.add(request_obj)
+        session.flush()
+        session.add(EntityModel(request_id=request_obj.id, entity_id=uuid4(), entity_type='folder'))
+        for review_status, copy_status, file_size in [
+            ('pending', 'pending', 10),
+            ('approved', 'pending', 20),
+            ('approved', 'copied', 30),
+            ('denied', 'pending', 40),
+        ]:
+            session.add(
+                EntityModel(
+                    request_id=request_obj.id,
+                    entity_id=uuid4(),
+                    entity_type='file',
+                    review_status=review_status,
+                    copy_status=copy_status,
+                    file_size=file_size,
+                )
+            )
+        session.commit()
+        request_id = str(request_obj.id)
+    engine.dispose()
+
+    response = test_client.get('/v1/request/copy/summary_fake_project/summary', params={'request_id': request_id})
+
+    assert response.status_code == 200
+    assert response.json()['result'] == {
+        'total': {'count': 4, 'size': 100},
+        'review_status': {
+            'pending': {'count': 1, 'size': 10},
+            'approved': {'count': 2, 'size': 50},
+            'denied': {'count': 1, 'size': 40},
+        },
+        'copy_status': {'pending': {'count': 3, 'size': 70}, 'copied': {'count': 1, 'size': 30}},
+    }
+
+
+def test_get_summary_of_request_without_files_returns_zeros_200(test_client):
+    response = test_client.get('/v1/request/copy/summary_fake_project/summary', params={'request_id': str(uuid4())})
+
+    assert response.status_code == 200
+    assert response.json()['result']['total'] == {'count': 0, 'size': 0}
+    assert response.json()['result']['review_status']['pending'] == {'count': 0, 'size': 0}
+
+
+def test_export_request_files_streams_ndjson_200(test_client, db, mocker):
+    mocker.patch.object(ConfigClass, 'EXPORT_BATCH_SIZE', 2)
+    request_id, entity_ids = create_entity_chain(db, 'export_fake_project', 5)
+
+    response = test_client.get('/v1/request/copy/export_fake_project/export', params={'request_id': request_id})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['entity_id'] for row in rows] == entity_ids
+    assert rows[0]['request_id'] == request_id
+
+
+def test_export_request_files_streams_csv_200(test_client, db):
+    request_id, entity_ids = create_entity_chain(db, 'export_fake_project', 3)
+
+    params = {'request_id': request_id, 'format': 'csv'}
+    response = test_client.get('/v1/request/copy/export_fake_project/export', params=params)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['entity_id'] for row in rows] == entity_ids
+    assert rows[1]['parent_id'] == entity_ids[0]
+
+
+def test_export_request_files_streams_on_single_connection_200(test_client, db, mocker):
+    request_id, entity_ids = create_entity_chain(db, 'export_fake_project', 3)
+    export_ndjson = EXPORTERS['ndjson']
+    checked_out = []
+
+    async def export(request_id):
+        async for chunk in export_ndjson(request_id):
+            checked_out.append(database.pool_status()['checked_out'])
+            yield chunk
+
+    mocker.patch.dict(EXPORTERS, {'ndjson': export})
+    response = test_client.get('/v1/request/copy/export_fake_project/export', params={'request_id': request_id})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == len(entity_ids)
+    assert checked_out == [1]
+
+
+def test_export_request_files_unknown_request_404(test_client):
+    response = test_client.get('/v1/request/copy/export_fake_project/export', params={'request_id': str(uuid4())})
+    assert response.status_code == 404
+
+
+def test_export_request_files_invalid_format_400(test_client):
+    params = {'request_id': str(uuid4()), 'format': 'xml'}
+    response = test_client.get('/v1/request/copy/export_fake_project/export', params=params)
+    assert response.status_code == 400
@@ -0,0 +1,20 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+from app.config import ConfigClass
+
+
+def test_db_pool_reports_checkout_metrics_200(test_client):
+    response = test_client.get('/v1/request/copy/pool_fake_project', params={'status': 'pending'})
+    assert response.status_code == 200
+
+    response = test_client.get('/v1/health/db-pool/')
+    assert response.status_code == 200
+    result = response.json()
+    assert result['max_connections'] == ConfigClass.RDS_POOL_SIZE + ConfigClass.RDS_POOL_MAX_OVERFLOW
+    assert result['checked_out'] == 0
+    assert result['checkouts'] >= 1
+    assert result['timeouts'] == 0
@@ -0,0 +1,113 @@
+# Copyright (C) 2022-Present Indoc Systems
+#
+# Licensed under the GNU AFFERO GENERAL PUBLIC LICENSE,
+# Version 3.0 (the "License") available at https://www.gnu.org/licenses/agpl-3.0.en.html.
+# You may not use this file except in compliance with the License.
+
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+from sqlalchemy import select
+
+from app.commons.outbox import outbox_dispatcher
+from app.config import ConfigClass
+from app.models.copy_request_sql import OutboxModel
+from app.routers.v1.api_copy_request.request_notify import notify_project_admins
+
+
+@pytest.fixture
+def mock_admins(httpx_mock, mock_user, mock_project):
+    admins = [
+        {
+            'email': f'admin{i}@test.com',
+            'username': f'admin{i}',
+            'first_name': f'Admin{i}',
+        }
+        for i in range(5)
+    ]
+    httpx_mock.add_response(
+        method='POST',
+        url=ConfigClass.AUTH_SERVICE + 'admin/roles/users',
+        json={'result': admins},
+    )
+    return admins
+
+
+@pytest_asyncio.fixture
+async def outbox(db_session):
+    yield db_session
+    await db_session.execute(delete(OutboxModel))
+    await db_session.commit()
+
+
+def sent_emails(httpx_mock) -> list[dict]:
+    return [
+        json.loads(request.content) for request in httpx_mock.get_requests(url=ConfigClass.EMAIL_SERVICE + 'email/')
+    ]
+
+
+@pytest.mark.asyncio
+async def test_notify_project_admins_enqueues_email_for_every_admin(
+    started_http_clients, httpx_mock, mock_admins, outbox
+):
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    await notify_project_admins('admin', 'testproject', '2022-01-01 00:00:00')
+    query = select(OutboxModel).where(OutboxModel.kind == 'notify_project_admin')
+    assert len((await outbox.execute(query)).scalars().all()) == len(mock_admins)
+
+    await outbox_dispatcher.drain()
+
+    payloads = sent_emails(httpx_mock)
+    assert sorted(payload['receiver'][0] for payload in payloads) == [admin['email'] for admin in mock_admins]
+    assert sorted(payload['template_kwargs']['admin_first_name'] for payload in payloads) == [
+        admin['first_name'] for admin in mock_admins
+    ]
+
+
+@pytest.mark.asyncio
+async def test_notify_project_admins_retries_only_failed_admin_email(
+    started_http_clients, mocker, httpx_mock, mock_admins, outbox
+):
+    failing = {mock_admins[2]['email']}
+
+    def send_email(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content)['receiver'][0] in failing:
+            raise httpx.ConnectError('Email service is down', request=request)
+        return httpx.Response(status_code=200, json={})
+
+    httpx_mock.add_callback(send_email, method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/')
+
+    await notify_project_admins('admin', 'testproject', '2022-01-01 00:00:00')
+    await outbox_dispatcher.drain()
+    assert len(sent_emails(httpx_mock)) == len(mock_admins)
+
+    mocker.patch.object(ConfigClass, 'OUTBOX_RETRY_BACKOFF', 0.0)
+    failing.clear()
+    query = select(OutboxModel).where(OutboxModel.status == 'pending')
+    for message in (await outbox.execute(query)).scalars():
+        message.next_attempt_at = message.created_at
+    await outbox.commit()
+    await outbox_dispatcher.drain()
+
+    payloads = sent_emails(httpx_mock)
+    assert len(payloads) == len(mock_admins) + 1
+    assert payloads[-1]['receiver'] == [mock_admins[2]['email']]
+
+
+@pytest.mark.asyncio
+async def test_notify_project_admins_sends_single_email_in_multi_recipient_mode(
+    started_http_clients, mocker, httpx_mock, mock_admins, outbox
+):
+    mocker.patch.object(ConfigClass, 'EMAIL_MULTI_RECIPIENT', True)
+    httpx_mock.add_response(method='POST', url=ConfigClass.EMAIL_SERVICE + 'email/', json={})
+
+    await notify_project_admins('admin', 'testproject', '2022-01-01 00:00:00')
+
+    requests = httpx_mock.get_requests(url=ConfigClass.EMAIL_SERVICE + 'email/')
+    assert len(requests) == 1
+    assert json.loads(requests[0].content)['receiver'] == [admin['email'] for admin in mock_admins]
+    assert (await outbox.execute(select(OutboxModel))).scalars().all() == []